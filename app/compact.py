@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+SET_FIELDS = (
+    "target_reps_min",
+    "target_reps_max",
+    "target_rpe",
+    "rest_seconds",
+    "load_suggestion",
+    "tempo",
+    "notes",
+)
+
+
+def compact_prescription(prescription: dict) -> dict:
+    groups: list[dict] = []
+    next_set_number = 1
+    for set_row in prescription["sets"]:
+        shared = {field: set_row[field] for field in SET_FIELDS if set_row.get(field) is not None}
+        last = groups[-1] if groups else None
+        if last and last["set"] == shared and set_row["set_number"] == next_set_number:
+            last["count"] += 1
+        else:
+            group = {"count": 1, "set": shared}
+            if set_row["set_number"] != next_set_number:
+                group["first_set_number"] = set_row["set_number"]
+            groups.append(group)
+        next_set_number = set_row["set_number"] + 1
+    return {"set_groups": groups}
+
+
+def expand_prescription(prescription: dict) -> dict:
+    if "set_groups" not in prescription:
+        return prescription
+    sets = []
+    next_set_number = 1
+    for group in prescription["set_groups"]:
+        set_number = group.get("first_set_number", next_set_number)
+        for offset in range(group["count"]):
+            set_row = {"set_number": set_number + offset}
+            set_row.update({field: group["set"].get(field) for field in SET_FIELDS})
+            sets.append(set_row)
+        next_set_number = set_number + group["count"]
+    return {"sets": sets}
+
+
+def is_compact(plan: dict) -> bool:
+    return any("set_groups" in item["prescription"] for item in plan.get("items", []))
+
+
+def compact_plan(plan: dict) -> dict:
+    return {
+        **plan,
+        "items": [
+            {**item, "prescription": compact_prescription(item["prescription"])}
+            for item in plan["items"]
+        ],
+    }
+
+
+def expand_plan(plan: dict) -> dict:
+    if not is_compact(plan):
+        return plan
+    return {
+        **plan,
+        "items": [
+            {**item, "prescription": expand_prescription(item["prescription"])}
+            for item in plan["items"]
+        ],
+    }
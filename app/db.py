@@ -1,30 +1,274 @@
 from __future__ import annotations
 
+import bisect
+import hashlib
+import itertools
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterator
+from typing import Callable, Iterator
+from uuid import uuid4
 
 import psycopg2
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
+
+from app.compact import compact_plan, compact_prescription, expand_plan
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 SPEC_DIR = BASE_DIR / "spec"
 
 
+class WeeklyPlanConflict(Exception):
+    def __init__(self, week_start_dates: list[str]) -> None:
+        super().__init__(f"Weekly plans already exist for {', '.join(week_start_dates)}")
+        self.week_start_dates = week_start_dates
+
+
+class UserMoveConflict(Exception):
+    def __init__(self, user_id: str, table: str) -> None:
+        super().__init__(f"User {user_id} has conflicting {table} rows on the target shard")
+        self.user_id = user_id
+        self.table = table
+
+
+class StatsConflict(Exception):
+    def __init__(self, user_id: str, exercise_id: str, attempts: int) -> None:
+        super().__init__(
+            f"Stats for {user_id}/{exercise_id} changed concurrently {attempts} times"
+        )
+        self.user_id = user_id
+        self.exercise_id = exercise_id
+
+
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("WORKOUT_REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_HEALTH_INTERVAL_SECONDS = float(os.environ.get("WORKOUT_REPLICA_HEALTH_INTERVAL_SECONDS", "5"))
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("WORKOUT_READ_YOUR_WRITES_SECONDS", "10"))
+
+_replica_health: dict[str, tuple[float, bool]] = {}
+_replica_health_lock = threading.Lock()
+_replica_checks: set[str] = set()
+_replica_cursor = itertools.count()
+_write_positions: ContextVar[dict[str, str] | None] = ContextVar("write_positions", default=None)
+
+
 def _database_url() -> str:
-    return (
+    return os.environ.get(
+        "WORKOUT_DATABASE_URL",
         "dbname=workout_app user=workout_app password=workout_app "
-        "host=localhost port=5432"
+        "host=localhost port=5432",
+    )
+
+
+def _replica_urls() -> list[str]:
+    raw = os.environ.get("WORKOUT_DATABASE_REPLICA_URLS", "")
+    return [url.strip() for url in raw.split(",") if url.strip()]
+
+
+SHARD_VIRTUAL_NODES = 64
+
+USER_TABLES = [
+    ("users", "id = %s", "id", True),
+    ("user_exercise_stats", "user_id = %s", "user_id, exercise_id", True),
+    ("weekly_plans", "user_id = %s", "id", False),
+    (
+        "weekly_plan_days",
+        "weekly_plan_id IN (SELECT id FROM weekly_plans WHERE user_id = %s)",
+        "weekly_plan_id, date",
+        False,
+    ),
+    ("session_plans", "user_id = %s", "id", False),
+    ("session_logs", "user_id = %s", "id", False),
+    (
+        "session_log_sets",
+        "session_log_id IN (SELECT id FROM session_logs WHERE user_id = %s)",
+        "id",
+        False,
+    ),
+    ("progression_outbox", "user_id = %s", "id", False),
+]
+
+
+def shards() -> list[dict]:
+    raw = os.environ.get("WORKOUT_DATABASE_SHARDS")
+    if raw:
+        return _parse_shards(raw)
+    return [{"name": "default", "primary": _database_url(), "replicas": _replica_urls()}]
+
+
+@lru_cache(maxsize=8)
+def _parse_shards(raw: str) -> list[dict]:
+    return [
+        {"name": shard["name"], "primary": shard["primary"], "replicas": shard.get("replicas", [])}
+        for shard in json.loads(raw)
+    ]
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+@lru_cache(maxsize=8)
+def _hash_ring(names: tuple[str, ...]) -> tuple[list[int], list[str]]:
+    points = sorted(
+        (_ring_hash(f"{name}#{node}"), name)
+        for name in names
+        for node in range(SHARD_VIRTUAL_NODES)
     )
+    return [point for point, _ in points], [name for _, name in points]
+
+
+def shard_for_user(user_id: str) -> dict:
+    configured = shards()
+    if len(configured) == 1:
+        return configured[0]
+    points, names = _hash_ring(tuple(shard["name"] for shard in configured))
+    index = bisect.bisect(points, _ring_hash(str(user_id))) % len(points)
+    return next(shard for shard in configured if shard["name"] == names[index])
+
+
+def _replica_lag_seconds(dsn: str) -> float:
+    conn = psycopg2.connect(dsn, connect_timeout=2)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )
+            lag = cur.fetchone()[0]
+    finally:
+        conn.close()
+    return float(lag or 0)
+
+
+def _check_replica(dsn: str) -> None:
+    try:
+        healthy = _replica_lag_seconds(dsn) <= REPLICA_MAX_LAG_SECONDS
+    except psycopg2.Error:
+        healthy = False
+    with _replica_health_lock:
+        _replica_health[dsn] = (time.monotonic(), healthy)
+        _replica_checks.discard(dsn)
+
+
+def _replica_is_healthy(dsn: str) -> bool:
+    checked = _replica_health.get(dsn)
+    if checked and time.monotonic() - checked[0] < REPLICA_HEALTH_INTERVAL_SECONDS:
+        return checked[1]
+    with _replica_health_lock:
+        start_check = dsn not in _replica_checks
+        _replica_checks.add(dsn)
+    if start_check:
+        threading.Thread(
+            target=_check_replica, args=(dsn,), name="replica-health-check", daemon=True
+        ).start()
+    return checked[1] if checked else False
+
+
+def _mark_replica_down(dsn: str) -> None:
+    _replica_health[dsn] = (time.monotonic(), False)
+
+
+def replica_status() -> dict[str, dict[str, bool]]:
+    return {
+        shard["name"]: {dsn: _replica_is_healthy(dsn) for dsn in shard["replicas"]}
+        for shard in shards()
+    }
+
+
+def _lsn_value(lsn: str) -> int:
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def parse_write_positions(raw: str | None) -> dict[str, str]:
+    positions = {}
+    for entry in (raw or "").split("|"):
+        name, _, lsn = entry.rpartition(":")
+        try:
+            _lsn_value(lsn)
+        except ValueError:
+            continue
+        if name:
+            positions[name] = lsn
+    return positions
+
+
+def format_write_positions(positions: dict[str, str]) -> str:
+    return "|".join(f"{name}:{lsn}" for name, lsn in sorted(positions.items()))
+
+
+@contextmanager
+def tracking_write_positions(raw: str | None = None) -> Iterator[dict[str, str]]:
+    positions = parse_write_positions(raw)
+    token = _write_positions.set(positions)
+    try:
+        yield positions
+    finally:
+        _write_positions.reset(token)
+
+
+def _record_write(conn: psycopg2.extensions.connection, shard: dict) -> None:
+    positions = _write_positions.get()
+    if positions is None or not shard["replicas"]:
+        return
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_current_wal_lsn()::text")
+        lsn = cur.fetchone()[0]
+    conn.commit()
+    known = positions.get(shard["name"])
+    if known is None or _lsn_value(lsn) > _lsn_value(known):
+        positions[shard["name"]] = lsn
+
+
+def _replica_has_replayed(conn: psycopg2.extensions.connection, lsn: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT COALESCE(pg_last_wal_replay_lsn(), pg_current_wal_lsn()) >= %s::pg_lsn",
+            (lsn,),
+        )
+        replayed = bool(cur.fetchone()[0])
+    conn.rollback()
+    return replayed
+
+
+def _connect(readonly: bool, shard: dict) -> psycopg2.extensions.connection:
+    replicas = shard["replicas"]
+    if readonly and replicas:
+        written = (_write_positions.get() or {}).get(shard["name"])
+        start = next(_replica_cursor)
+        for offset in range(len(replicas)):
+            dsn = replicas[(start + offset) % len(replicas)]
+            if not _replica_is_healthy(dsn):
+                continue
+            try:
+                conn = psycopg2.connect(dsn, connect_timeout=2)
+            except psycopg2.OperationalError:
+                _mark_replica_down(dsn)
+                continue
+            if written is None or _replica_has_replayed(conn, written):
+                return conn
+            conn.close()
+    return psycopg2.connect(shard["primary"])
 
 
 @contextmanager
-def get_conn() -> Iterator[psycopg2.extensions.connection]:
-    conn = psycopg2.connect(_database_url())
+def get_conn(
+    readonly: bool = False, user_id: str | None = None, shard: dict | None = None
+) -> Iterator[psycopg2.extensions.connection]:
+    if shard is None:
+        shard = shard_for_user(user_id) if user_id is not None else shards()[0]
+    conn = _connect(readonly, shard)
     try:
         yield conn
         conn.commit()
+        if not readonly:
+            _record_write(conn, shard)
     except Exception:
         conn.rollback()
         raise
@@ -32,28 +276,136 @@ def get_conn() -> Iterator[psycopg2.extensions.connection]:
         conn.close()
 
 
+_exercise_library: dict[str, dict] | None = None
+_exercise_library_lock = threading.Lock()
+_user_timezones: OrderedDict[str, str] = OrderedDict()
+_user_timezones_lock = threading.Lock()
+USER_TIMEZONE_CACHE_SIZE = int(os.environ.get("WORKOUT_USER_TIMEZONE_CACHE_SIZE", "10000"))
+
+INVALIDATION_CHANNEL = "workout_cache_invalidation"
+
+
+def compact_plan_storage_enabled() -> bool:
+    return os.environ.get("WORKOUT_COMPACT_PLAN_STORAGE", "").lower() in ("1", "true", "yes")
+
+
+def fast_start_enabled() -> bool:
+    return os.environ.get("WORKOUT_FAST_START", "").lower() in ("1", "true", "yes")
+
+
+def _schema_sql() -> str:
+    return (SPEC_DIR / "db" / "schema.sql").read_text()
+
+
+def schema_version() -> str:
+    return hashlib.sha256(_schema_sql().encode()).hexdigest()[:16]
+
+
 def init_db() -> None:
-    schema_sql = (SPEC_DIR / "db" / "schema.sql").read_text()
+    schema_sql = _schema_sql()
     schema_sql = schema_sql.replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS ")
     schema_sql = schema_sql.replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ")
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(schema_sql)
+    for shard in shards():
+        with get_conn(shard=shard) as conn:
+            with conn.cursor() as cur:
+                cur.execute(schema_sql)
+                cur.execute(
+                    "INSERT INTO schema_version (version) VALUES (%s) ON CONFLICT (version) DO NOTHING",
+                    (schema_version(),),
+                )
 
 
-def ensure_user(user_id: str, timezone: str) -> None:
-    with get_conn() as conn:
+def schema_is_current() -> bool:
+    try:
+        for shard in shards():
+            with get_conn(shard=shard) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT 1 FROM schema_version WHERE version = %s", (schema_version(),)
+                    )
+                    if cur.fetchone() is None:
+                        return False
+    except psycopg2.errors.UndefinedTable:
+        return False
+    return True
+
+
+def _publish_invalidation(cur, table: str, user_id: str | None = None) -> None:
+    cur.execute(
+        "SELECT pg_notify(%s, %s)",
+        (INVALIDATION_CHANNEL, json.dumps({"table": table, "user_id": user_id})),
+    )
+
+
+def apply_invalidation(message: dict) -> None:
+    if message.get("table") == "exercises":
+        invalidate_exercise_library()
+    elif message.get("table") == "users" and message.get("user_id"):
+        _forget_user_timezone(message["user_id"])
+    else:
+        flush_caches()
+
+
+def flush_caches() -> None:
+    invalidate_exercise_library()
+    with _user_timezones_lock:
+        _user_timezones.clear()
+
+
+def ensure_user(user_id: str, timezone: str | None = None) -> None:
+    with get_conn(user_id=user_id) as conn:
         with conn.cursor() as cur:
+            if timezone is None:
+                cur.execute(
+                    "INSERT INTO users (id, timezone) VALUES (%s, 'UTC') ON CONFLICT (id) DO NOTHING",
+                    (user_id,),
+                )
+                return
             cur.execute(
                 "INSERT INTO users (id, timezone) VALUES (%s, %s) "
                 "ON CONFLICT (id) DO UPDATE SET timezone = EXCLUDED.timezone",
                 (user_id, timezone),
             )
+            _publish_invalidation(cur, "users", user_id)
+    _remember_user_timezone(user_id, timezone)
+
+
+def _remember_user_timezone(user_id: str, timezone: str) -> None:
+    with _user_timezones_lock:
+        _user_timezones[user_id] = timezone
+        _user_timezones.move_to_end(user_id)
+        while len(_user_timezones) > USER_TIMEZONE_CACHE_SIZE:
+            _user_timezones.popitem(last=False)
+
+
+def _forget_user_timezone(user_id: str) -> None:
+    with _user_timezones_lock:
+        _user_timezones.pop(user_id, None)
+
+
+def get_user_timezone(user_id: str) -> str | None:
+    with _user_timezones_lock:
+        timezone = _user_timezones.get(user_id)
+        if timezone is not None:
+            _user_timezones.move_to_end(user_id)
+    if timezone is not None:
+        return timezone
+    with get_conn(readonly=True, user_id=user_id) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT timezone FROM users WHERE id = %s", (user_id,))
+            row = cur.fetchone()
+    if row:
+        _remember_user_timezone(user_id, row[0])
+        return row[0]
+    return None
+
+
+def load_exercise_seed() -> list[dict]:
+    return json.loads((SPEC_DIR / "exercises_seed.json").read_text())
 
 
 def seed_exercises() -> int:
-    seed_path = SPEC_DIR / "exercises_seed.json"
-    exercises = json.loads(seed_path.read_text())
+    exercises = load_exercise_seed()
     insert_sql = (
         "INSERT INTO exercises ("
         "id, name, pattern, equipment, default_rep_min, default_rep_max, "
@@ -64,15 +416,18 @@ def seed_exercises() -> int:
         "%(rounding_step)s"
         ") ON CONFLICT (id) DO NOTHING"
     )
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            for exercise in exercises:
-                cur.execute(insert_sql, exercise)
+    for shard in shards():
+        with get_conn(shard=shard) as conn:
+            with conn.cursor() as cur:
+                for exercise in exercises:
+                    cur.execute(insert_sql, exercise)
+                _publish_invalidation(cur, "exercises")
+    invalidate_exercise_library()
     return len(exercises)
 
 
 def fetch_exercises() -> dict[str, dict]:
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 "SELECT id, name, pattern, equipment, default_rep_min, "
@@ -96,61 +451,149 @@ def fetch_exercises() -> dict[str, dict]:
     }
 
 
-def fetch_user_exercise_stats(user_id: str) -> dict[str, dict]:
-    with get_conn() as conn:
+def get_exercise_library() -> dict[str, dict]:
+    global _exercise_library
+    library = _exercise_library
+    if library is not None:
+        return library
+    with _exercise_library_lock:
+        if _exercise_library is not None:
+            return _exercise_library
+        library = fetch_exercises()
+        if library:
+            _exercise_library = library
+        return library
+
+
+def invalidate_exercise_library() -> None:
+    global _exercise_library
+    with _exercise_library_lock:
+        _exercise_library = None
+
+
+def _warm_exercise_library(ready: Callable[[], object] | None) -> None:
+    if ready is not None:
+        ready()
+    try:
+        get_exercise_library()
+    except psycopg2.Error:
+        pass
+
+
+def warm_exercise_library(ready: Callable[[], object] | None = None) -> threading.Thread:
+    thread = threading.Thread(
+        target=_warm_exercise_library,
+        args=(ready,),
+        name="exercise-library-warmup",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+_STATS_COLUMNS = (
+    "exercise_id, phase, next_load, rep_min, rep_max, target_rpe, "
+    "stagnation_count, version, last_n_sessions, last_session_log_id"
+)
+
+
+def _stats_from_row(row: tuple) -> dict:
+    return {
+        "exercise_id": row[0],
+        "phase": row[1],
+        "next_load": float(row[2]) if row[2] is not None else None,
+        "rep_min": row[3],
+        "rep_max": row[4],
+        "target_rpe": float(row[5]),
+        "stagnation_count": row[6],
+        "version": row[7],
+        "last_n_sessions": row[8],
+        "last_session_log_id": str(row[9]) if row[9] is not None else None,
+    }
+
+
+def _stats_params(user_id: str, stats: dict) -> tuple:
+    return (
+        stats["phase"],
+        stats["next_load"],
+        stats["rep_min"],
+        stats["rep_max"],
+        stats["target_rpe"],
+        stats["stagnation_count"],
+        Json(stats.get("last_n_sessions") or {}),
+        stats.get("last_session_log_id"),
+        user_id,
+        stats["exercise_id"],
+    )
+
+
+def fetch_user_exercise_stats(
+    user_id: str, readonly: bool = True, exercise_id: str | None = None
+) -> dict[str, dict]:
+    exercise_filter = " AND exercise_id = %s" if exercise_id else ""
+    with get_conn(readonly=readonly, user_id=user_id) as conn:
         with conn.cursor() as cur:
             cur.execute(
-                "SELECT exercise_id, phase, next_load, rep_min, rep_max, target_rpe, "
-                "stagnation_count "
-                "FROM user_exercise_stats WHERE user_id = %s",
-                (user_id,),
+                f"SELECT {_STATS_COLUMNS} FROM user_exercise_stats "
+                f"WHERE user_id = %s{exercise_filter}",
+                (user_id, exercise_id) if exercise_id else (user_id,),
             )
             rows = cur.fetchall()
-    return {
-        row[0]: {
-            "exercise_id": row[0],
-            "phase": row[1],
-            "next_load": float(row[2]) if row[2] is not None else None,
-            "rep_min": row[3],
-            "rep_max": row[4],
-            "target_rpe": float(row[5]),
-            "stagnation_count": row[6],
-        }
-        for row in rows
-    }
+    return {row[0]: _stats_from_row(row) for row in rows}
 
 
-def upsert_user_exercise_stats(user_id: str, stats: dict) -> None:
-    with get_conn() as conn:
+def insert_user_exercise_stats(user_id: str, stats: dict) -> bool:
+    with get_conn(user_id=user_id) as conn:
         with conn.cursor() as cur:
             cur.execute(
-                "INSERT INTO user_exercise_stats (user_id, exercise_id, phase, next_load, "
-                "rep_min, rep_max, target_rpe, stagnation_count) "
-                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
-                "ON CONFLICT (user_id, exercise_id) DO UPDATE SET "
-                "phase = EXCLUDED.phase, next_load = EXCLUDED.next_load, "
-                "rep_min = EXCLUDED.rep_min, rep_max = EXCLUDED.rep_max, "
-                "target_rpe = EXCLUDED.target_rpe, stagnation_count = EXCLUDED.stagnation_count, "
-                "last_updated_at = now()",
-                (
-                    user_id,
-                    stats["exercise_id"],
-                    stats["phase"],
-                    stats["next_load"],
-                    stats["rep_min"],
-                    stats["rep_max"],
-                    stats["target_rpe"],
-                    stats["stagnation_count"],
-                ),
+                "INSERT INTO user_exercise_stats (phase, next_load, rep_min, rep_max, "
+                "target_rpe, stagnation_count, last_n_sessions, last_session_log_id, "
+                "user_id, exercise_id, version) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+                "ON CONFLICT (user_id, exercise_id) DO NOTHING",
+                (*_stats_params(user_id, stats), stats.get("version", 0)),
             )
+            return cur.rowcount == 1
 
 
-def insert_session_plan(plan: dict) -> str:
-    with get_conn() as conn:
+def compare_and_swap_user_exercise_stats(
+    user_id: str, stats: dict, expected_version: int
+) -> bool:
+    with get_conn(user_id=user_id) as conn:
         with conn.cursor() as cur:
             cur.execute(
-                "INSERT INTO session_plans (id, user_id, date, timezone, session_type, phase, plan_json) "
-                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                "UPDATE user_exercise_stats SET phase = %s, next_load = %s, rep_min = %s, "
+                "rep_max = %s, target_rpe = %s, stagnation_count = %s, last_n_sessions = %s, "
+                "last_session_log_id = %s, version = version + 1, last_updated_at = now() "
+                "WHERE user_id = %s AND exercise_id = %s AND version = %s",
+                (*_stats_params(user_id, stats), expected_version),
+            )
+            return cur.rowcount == 1
+
+
+def content_etag(payload: dict) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:32]
+
+
+_STALE_STATS_SQL = (
+    "FROM user_exercise_stats s "
+    "WHERE s.user_id = sp.user_id AND sp.stats_versions ? s.exercise_id "
+    "AND (sp.stats_versions ->> s.exercise_id)::int <> s.version"
+)
+_STALE_EXERCISES_SQL = f"SELECT array_agg(s.exercise_id) {_STALE_STATS_SQL}"
+
+
+def insert_session_plan(plan: dict, stats_versions: dict[str, int]) -> dict:
+    etag = content_etag(plan)
+    stored_plan = compact_plan(plan) if compact_plan_storage_enabled() else plan
+    with get_conn(user_id=plan["user_id"]) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO session_plans "
+                "(id, user_id, date, timezone, session_type, phase, plan_json, stats_versions, etag) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) "
+                "ON CONFLICT (user_id, date, session_type) DO NOTHING RETURNING id",
                 (
                     plan["id"],
                     plan["user_id"],
@@ -158,53 +601,227 @@ def insert_session_plan(plan: dict) -> str:
                     plan["timezone"],
                     plan["session_type"],
                     plan["phase"],
-                    Json(plan),
+                    Json(stored_plan),
+                    Json(stats_versions),
+                    etag,
                 ),
             )
-    return plan["id"]
+            if cur.fetchone():
+                return {"plan": plan, "etag": etag}
+            cur.execute(
+                "SELECT plan_json, etag FROM session_plans "
+                "WHERE user_id = %s AND date = %s AND session_type = %s",
+                (plan["user_id"], plan["date"], plan["session_type"]),
+            )
+            row = cur.fetchone()
+    return {"plan": expand_plan(row[0]), "etag": row[1]}
 
 
 def fetch_session_plan(user_id: str, date_str: str, session_type: str) -> dict | None:
-    with get_conn() as conn:
+    with get_conn(readonly=True, user_id=user_id) as conn:
         with conn.cursor() as cur:
             cur.execute(
-                "SELECT plan_json FROM session_plans WHERE user_id = %s AND date = %s AND session_type = %s",
+                f"SELECT sp.plan_json, sp.etag, COALESCE(({_STALE_EXERCISES_SQL}), '{{}}') "
+                "FROM session_plans sp WHERE sp.user_id = %s AND sp.date = %s AND sp.session_type = %s",
                 (user_id, date_str, session_type),
             )
             row = cur.fetchone()
-    return row[0] if row else None
+    if not row:
+        return None
+    return {"plan": expand_plan(row[0]), "etag": row[1], "stale_exercise_ids": set(row[2])}
 
 
-def insert_weekly_plan(plan: dict, days: list[dict]) -> None:
-    with get_conn() as conn:
+def fetch_session_plan_etag(user_id: str, date_str: str, session_type: str) -> dict | None:
+    with get_conn(readonly=True, user_id=user_id) as conn:
         with conn.cursor() as cur:
             cur.execute(
-                "INSERT INTO weekly_plans (id, user_id, week_start_date, timezone, strategy) "
-                "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (user_id, week_start_date) DO NOTHING",
-                (
-                    plan["id"],
-                    plan["user_id"],
-                    plan["week_start_date"],
-                    plan["timezone"],
-                    plan["strategy"],
-                ),
+                f"SELECT sp.etag, EXISTS (SELECT 1 {_STALE_STATS_SQL}) "
+                "FROM session_plans sp WHERE sp.user_id = %s AND sp.date = %s AND sp.session_type = %s",
+                (user_id, date_str, session_type),
             )
-            for day in days:
-                cur.execute(
-                    "INSERT INTO weekly_plan_days (weekly_plan_id, date, label, session_plan_id, notes) "
-                    "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (weekly_plan_id, date) DO NOTHING",
+            row = cur.fetchone()
+    if not row:
+        return None
+    return {"etag": row[0], "stale": row[1]}
+
+
+def patch_session_plan_items(
+    user_id: str,
+    plan_id: str,
+    phase: str,
+    prescriptions: dict[int, dict],
+    stats_versions: dict[str, int],
+    etag: str,
+) -> None:
+    plan_expr = "jsonb_set(plan_json, '{phase}', to_jsonb(%s::text))"
+    params: list = [phase]
+    for index, prescription in prescriptions.items():
+        path = ["items", str(index), "prescription"]
+        plan_expr = (
+            f"jsonb_set({plan_expr}, %s, "
+            "CASE WHEN (plan_json #> %s::text[]) ? 'set_groups' THEN %s::jsonb ELSE %s::jsonb END)"
+        )
+        params.extend(
+            [path, path, Json(compact_prescription(prescription)), Json(prescription)]
+        )
+    with get_conn(user_id=user_id) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"UPDATE session_plans SET plan_json = {plan_expr}, phase = %s, "
+                "stats_versions = stats_versions || %s, etag = %s WHERE id = %s",
+                (*params, phase, Json(stats_versions), etag, plan_id),
+            )
+
+
+def insert_weekly_plans(
+    user_id: str, plans: list[dict], days: dict[str, list[dict]], on_conflict: str = "SKIP"
+) -> dict[str, str]:
+    if on_conflict == "REPLACE":
+        conflict_sql = (
+            "ON CONFLICT (user_id, week_start_date) DO UPDATE SET "
+            "timezone = EXCLUDED.timezone, strategy = EXCLUDED.strategy, etag = EXCLUDED.etag"
+        )
+    else:
+        conflict_sql = "ON CONFLICT (user_id, week_start_date) DO NOTHING"
+    with get_conn(user_id=user_id) as conn:
+        with conn.cursor() as cur:
+            rows = execute_values(
+                cur,
+                "INSERT INTO weekly_plans (id, user_id, week_start_date, timezone, strategy, etag) "
+                f"VALUES %s {conflict_sql} RETURNING id, week_start_date",
+                [
                     (
                         plan["id"],
+                        user_id,
+                        plan["week_start_date"],
+                        plan["timezone"],
+                        plan["strategy"],
+                        content_etag(
+                            {
+                                "user_id": user_id,
+                                "week_start_date": plan["week_start_date"],
+                                "timezone": plan["timezone"],
+                                "strategy": plan["strategy"],
+                                "days": days[plan["week_start_date"]],
+                            }
+                        ),
+                    )
+                    for plan in plans
+                ],
+                page_size=len(plans),
+                fetch=True,
+            )
+            stored = {row[1].isoformat(): str(row[0]) for row in rows}
+            if on_conflict == "ERROR" and len(stored) < len(plans):
+                raise WeeklyPlanConflict(
+                    [plan["week_start_date"] for plan in plans if plan["week_start_date"] not in stored]
+                )
+            if not stored:
+                return stored
+            if on_conflict == "REPLACE":
+                cur.execute(
+                    "DELETE FROM weekly_plan_days WHERE weekly_plan_id = ANY(%s::uuid[])",
+                    (list(stored.values()),),
+                )
+            execute_values(
+                cur,
+                "INSERT INTO weekly_plan_days (weekly_plan_id, date, label, session_plan_id, notes) "
+                "VALUES %s",
+                [
+                    (
+                        plan_id,
                         day["date"],
                         day["label"],
                         day.get("session_plan_id"),
                         day.get("notes"),
-                    ),
-                )
+                    )
+                    for week_start, plan_id in stored.items()
+                    for day in days[week_start]
+                ],
+                page_size=1000,
+            )
+    return stored
+
+
+def fetch_weekly_plan_etag(user_id: str, week_start_date: str) -> str | None:
+    with get_conn(readonly=True, user_id=user_id) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT etag FROM weekly_plans WHERE user_id = %s AND week_start_date = %s",
+                (user_id, week_start_date),
+            )
+            row = cur.fetchone()
+    return row[0] if row else None
+
+
+def fetch_weekly_plan(user_id: str, week_start_date: str) -> dict | None:
+    with get_conn(readonly=True, user_id=user_id) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT weekly_plans.id, weekly_plans.timezone, weekly_plans.strategy, "
+                "weekly_plans.etag, weekly_plans.created_at, weekly_plan_days.date, "
+                "weekly_plan_days.label, weekly_plan_days.session_plan_id, weekly_plan_days.notes "
+                "FROM weekly_plans "
+                "JOIN weekly_plan_days ON weekly_plan_days.weekly_plan_id = weekly_plans.id "
+                "WHERE weekly_plans.user_id = %s AND weekly_plans.week_start_date = %s "
+                "ORDER BY weekly_plan_days.date",
+                (user_id, week_start_date),
+            )
+            rows = cur.fetchall()
+    if not rows:
+        return None
+    return {
+        "id": str(rows[0][0]),
+        "user_id": user_id,
+        "week_start_date": week_start_date,
+        "timezone": rows[0][1],
+        "strategy": rows[0][2],
+        "etag": rows[0][3],
+        "created_at": rows[0][4],
+        "days": [
+            {"date": row[5], "label": row[6], "session_plan_id": row[7], "notes": row[8]}
+            for row in rows
+        ],
+    }
+
+
+def fetch_session_plan_for_day(
+    user_id: str, date_str: str, known_etags: list[str] | None = None
+) -> dict | None:
+    with get_conn(readonly=True, user_id=user_id) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT weekly_plan_days.label, weekly_plans.timezone, "
+                "CASE WHEN sp.etag = ANY(%s::text[]) AND stale.ids IS NULL "
+                "THEN NULL ELSE sp.plan_json END, "
+                "sp.etag, COALESCE(stale.ids, '{}'), sp.id IS NOT NULL "
+                "FROM weekly_plans "
+                "JOIN weekly_plan_days ON weekly_plan_days.weekly_plan_id = weekly_plans.id "
+                "LEFT JOIN session_plans sp ON sp.user_id = weekly_plans.user_id "
+                "AND sp.date = weekly_plan_days.date AND sp.session_type = weekly_plan_days.label "
+                f"LEFT JOIN LATERAL (SELECT array_agg(s.exercise_id) AS ids {_STALE_STATS_SQL}) stale "
+                "ON true "
+                "WHERE weekly_plans.user_id = %s AND weekly_plan_days.date = %s",
+                (known_etags or [], user_id, date_str),
+            )
+            row = cur.fetchone()
+    if not row:
+        return None
+    return {
+        "label": row[0],
+        "timezone": row[1],
+        "stored": {
+            "plan": expand_plan(row[2]) if row[2] is not None else None,
+            "etag": row[3],
+            "stale_exercise_ids": set(row[4]),
+        }
+        if row[5]
+        else None,
+    }
 
 
 def fetch_weekly_plan_day(user_id: str, date_str: str) -> dict | None:
-    with get_conn() as conn:
+    with get_conn(readonly=True, user_id=user_id) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 "SELECT weekly_plans.id, weekly_plans.timezone, weekly_plans.strategy, "
@@ -225,8 +842,10 @@ def fetch_weekly_plan_day(user_id: str, date_str: str) -> dict | None:
     }
 
 
-def insert_session_log(log: dict, sets: list[dict]) -> str:
-    with get_conn() as conn:
+def insert_session_log(
+    log: dict, sets: list[dict], progression: dict[str, list[dict]] | None = None
+) -> str:
+    with get_conn(user_id=log["user_id"]) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 "INSERT INTO session_logs (id, user_id, session_plan_id, date, session_type, readiness_json, notes) "
@@ -255,4 +874,241 @@ def insert_session_log(log: dict, sets: list[dict]) -> str:
                         row.get("rpe"),
                     ),
                 )
+            _insert_progression_jobs(cur, log["user_id"], log["id"], progression or {})
     return log["id"]
+
+
+def _insert_progression_jobs(
+    cur, user_id: str, session_log_id: str, progression: dict[str, list[dict]]
+) -> None:
+    for exercise_id, exercise_sets in progression.items():
+        cur.execute(
+            "INSERT INTO progression_outbox (id, user_id, session_log_id, exercise_id, sets_json) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (str(uuid4()), user_id, session_log_id, exercise_id, Json(exercise_sets)),
+        )
+
+
+def enqueue_progression(
+    user_id: str, session_log_id: str, progression: dict[str, list[dict]]
+) -> None:
+    with get_conn(user_id=user_id) as conn:
+        with conn.cursor() as cur:
+            _insert_progression_jobs(cur, user_id, session_log_id, progression)
+
+
+_CLAIMABLE_OUTBOX_SQL = (
+    "o.status = 'PENDING' AND o.available_at <= now() "
+    "AND NOT EXISTS (SELECT 1 FROM progression_outbox p "
+    "WHERE p.user_id = o.user_id AND p.exercise_id = o.exercise_id "
+    "AND (p.created_at, p.id) < (o.created_at, o.id))"
+)
+
+
+def process_progression_job(
+    shard: dict,
+    handler: Callable[[dict], None],
+    user_id: str | None = None,
+    wait: bool = False,
+    max_attempts: int = 5,
+    lock_timeout: float | None = None,
+) -> str | None:
+    user_filter = "AND o.user_id = %s " if user_id else ""
+    lock_clause = "FOR UPDATE" if wait else "FOR UPDATE SKIP LOCKED"
+    with get_conn(shard=shard) as conn:
+        with conn.cursor() as cur:
+            if wait and lock_timeout is not None:
+                cur.execute(
+                    "SELECT set_config('lock_timeout', %s, true)",
+                    (f"{max(1, int(lock_timeout * 1000))}ms",),
+                )
+            cur.execute(
+                "SELECT o.id, o.user_id, o.exercise_id, o.sets_json, o.attempts, o.session_log_id "
+                "FROM progression_outbox o "
+                f"WHERE {_CLAIMABLE_OUTBOX_SQL} {user_filter}"
+                f"ORDER BY o.created_at, o.id LIMIT 1 {lock_clause}",
+                (user_id,) if user_id else (),
+            )
+            row = cur.fetchone()
+            if row is None:
+                return None
+            job = {
+                "id": str(row[0]),
+                "user_id": str(row[1]),
+                "exercise_id": row[2],
+                "sets": row[3],
+                "attempts": row[4],
+                "session_log_id": str(row[5]) if row[5] is not None else None,
+            }
+            try:
+                handler(job)
+            except Exception as exc:
+                status = "FAILED" if job["attempts"] + 1 >= max_attempts else "PENDING"
+                cur.execute(
+                    "UPDATE progression_outbox SET attempts = attempts + 1, status = %s, "
+                    "last_error = %s, available_at = now() + make_interval(secs => %s) "
+                    "WHERE id = %s",
+                    (status, repr(exc), 2 ** job["attempts"], job["id"]),
+                )
+                return "FAILED" if status == "FAILED" else "RETRY"
+            cur.execute("DELETE FROM progression_outbox WHERE id = %s", (job["id"],))
+    return "DONE"
+
+
+def has_pending_progression(user_id: str) -> bool:
+    with get_conn(user_id=user_id) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT EXISTS (SELECT 1 FROM progression_outbox o "
+                f"WHERE o.user_id = %s AND {_CLAIMABLE_OUTBOX_SQL})",
+                (user_id,),
+            )
+            return cur.fetchone()[0]
+
+
+def progression_backlog() -> dict[str, dict]:
+    backlog = {}
+    for shard in shards():
+        with get_conn(shard=shard) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT count(*) FILTER (WHERE status = 'PENDING'), "
+                    "count(*) FILTER (WHERE status = 'FAILED'), "
+                    "COALESCE(EXTRACT(EPOCH FROM now() - min(created_at) "
+                    "FILTER (WHERE status = 'PENDING')), 0) "
+                    "FROM progression_outbox"
+                )
+                pending, failed, lag = cur.fetchone()
+        backlog[shard["name"]] = {
+            "pending": pending,
+            "failed": failed,
+            "oldest_pending_seconds": round(float(lag), 3),
+        }
+    return backlog
+
+
+def failed_progression_jobs(user_id: str | None = None) -> list[dict]:
+    user_filter = " AND user_id = %s" if user_id else ""
+    jobs = []
+    for shard in [shard_for_user(user_id)] if user_id else shards():
+        with get_conn(shard=shard) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, user_id, session_log_id, exercise_id, attempts, last_error, "
+                    "created_at FROM progression_outbox "
+                    f"WHERE status = 'FAILED'{user_filter} ORDER BY created_at, id",
+                    (user_id,) if user_id else (),
+                )
+                rows = cur.fetchall()
+        jobs.extend(
+            {
+                "id": str(row[0]),
+                "user_id": str(row[1]),
+                "session_log_id": str(row[2]) if row[2] is not None else None,
+                "exercise_id": row[3],
+                "attempts": row[4],
+                "last_error": row[5],
+                "created_at": row[6].isoformat(),
+                "shard": shard["name"],
+            }
+            for row in rows
+        )
+    return jobs
+
+
+def requeue_progression_jobs(user_id: str | None = None) -> int:
+    user_filter = " AND user_id = %s" if user_id else ""
+    requeued = 0
+    for shard in [shard_for_user(user_id)] if user_id else shards():
+        with get_conn(shard=shard) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE progression_outbox SET status = 'PENDING', attempts = 0, "
+                    f"available_at = now() WHERE status = 'FAILED'{user_filter}",
+                    (user_id,) if user_id else (),
+                )
+                requeued += cur.rowcount
+    return requeued
+
+
+def _drop_generated_session_plans(source_cur, target_cur, user_id: str) -> None:
+    source_cur.execute(
+        "SELECT id, user_id, date, session_type FROM session_plans WHERE user_id = %s",
+        (user_id,),
+    )
+    rows = source_cur.fetchall()
+    if rows:
+        execute_values(
+            target_cur,
+            "DELETE FROM session_plans t USING (VALUES %s) AS s(id, user_id, date, session_type) "
+            "WHERE t.user_id = s.user_id AND t.date = s.date "
+            "AND t.session_type = s.session_type AND t.id <> s.id",
+            rows,
+            template="(%s::uuid, %s::uuid, %s::date, %s)",
+        )
+
+
+def _copy_user_rows(source_cur, target_cur, user_id: str) -> int:
+    copied = 0
+    for table, condition, key, source_wins in USER_TABLES:
+        source_cur.execute(f"SELECT * FROM {table} WHERE {condition}", (user_id,))
+        rows = source_cur.fetchall()
+        if not rows:
+            continue
+        names = [column.name for column in source_cur.description]
+        if source_wins:
+            updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in names)
+            on_conflict = f"ON CONFLICT ({key}) DO UPDATE SET {updates}"
+        else:
+            on_conflict = f"ON CONFLICT ({key}) DO NOTHING"
+        try:
+            execute_values(
+                target_cur,
+                f"INSERT INTO {table} ({', '.join(names)}) VALUES %s {on_conflict}",
+                [
+                    tuple(Json(value) if isinstance(value, (dict, list)) else value for value in row)
+                    for row in rows
+                ],
+                page_size=1000,
+            )
+        except psycopg2.errors.UniqueViolation as exc:
+            raise UserMoveConflict(user_id, table) from exc
+        copied += len(rows)
+    return copied
+
+
+def move_user(user_id: str, source: dict, target: dict) -> int:
+    with get_conn(shard=source) as source_conn, get_conn(shard=target) as target_conn:
+        with source_conn.cursor() as source_cur, target_conn.cursor() as target_cur:
+            source_cur.execute("SELECT id FROM users WHERE id = %s FOR UPDATE", (user_id,))
+            if source_cur.fetchone() is None:
+                return 0
+            _drop_generated_session_plans(source_cur, target_cur, user_id)
+            copied = _copy_user_rows(source_cur, target_cur, user_id)
+            _publish_invalidation(target_cur, "users", user_id)
+        target_conn.commit()
+        with source_conn.cursor() as source_cur:
+            source_cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+    _forget_user_timezone(user_id)
+    return copied
+
+
+def rebalance(dry_run: bool = False) -> list[dict]:
+    moves = []
+    for shard in shards():
+        with get_conn(shard=shard) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id FROM users")
+                user_ids = [str(row[0]) for row in cur.fetchall()]
+        for user_id in user_ids:
+            target = shard_for_user(user_id)
+            if target["name"] == shard["name"]:
+                continue
+            move = {"user_id": user_id, "source": shard["name"], "target": target["name"]}
+            if not dry_run:
+                try:
+                    move["rows"] = move_user(user_id, shard, target)
+                except UserMoveConflict as exc:
+                    move["error"] = str(exc)
+            moves.append(move)
+    return moves
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import os
+import select
+import threading
+
+import psycopg2
+import psycopg2.extensions
+
+from app import db
+
+POLL_SECONDS = float(os.environ.get("WORKOUT_INVALIDATION_POLL_SECONDS", "1"))
+RECONNECT_SECONDS = float(os.environ.get("WORKOUT_INVALIDATION_RECONNECT_SECONDS", "1"))
+
+_stop = threading.Event()
+_connected = threading.Event()
+_thread: threading.Thread | None = None
+_counters = {"received": 0, "errors": 0, "reconnects": 0}
+
+
+def invalidation_enabled() -> bool:
+    return os.environ.get("WORKOUT_CACHE_INVALIDATION", "on").lower() not in ("0", "off", "false", "no")
+
+
+def _dispatch(payload: str) -> None:
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        message = {}
+    if not isinstance(message, dict):
+        message = {}
+    _counters["received"] += 1
+    try:
+        db.apply_invalidation(message)
+    except Exception:
+        _counters["errors"] += 1
+        db.flush_caches()
+
+
+def _open_listeners() -> list[psycopg2.extensions.connection]:
+    conns = []
+    try:
+        for shard in db.shards():
+            conn = psycopg2.connect(shard["primary"])
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            conns.append(conn)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {db.INVALIDATION_CHANNEL}")
+    except psycopg2.Error:
+        for conn in conns:
+            conn.close()
+        raise
+    return conns
+
+
+def _listen() -> None:
+    while not _stop.is_set():
+        try:
+            conns = _open_listeners()
+        except psycopg2.Error:
+            _stop.wait(RECONNECT_SECONDS)
+            continue
+        db.flush_caches()
+        _connected.set()
+        try:
+            while not _stop.is_set():
+                ready, _, _ = select.select(conns, [], [], POLL_SECONDS)
+                for conn in ready:
+                    conn.poll()
+                    while conn.notifies:
+                        _dispatch(conn.notifies.pop(0).payload)
+        except (psycopg2.Error, OSError, ValueError):
+            _counters["reconnects"] += 1
+        finally:
+            _connected.clear()
+            for conn in conns:
+                conn.close()
+
+
+def start_listener() -> threading.Thread:
+    global _thread
+    _stop.clear()
+    _thread = threading.Thread(target=_listen, name="cache-invalidation-listener", daemon=True)
+    _thread.start()
+    return _thread
+
+
+def stop_listener(timeout: float = 5.0) -> None:
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout)
+        _thread = None
+
+
+def wait_until_listening(timeout: float | None = None) -> bool:
+    return _connected.wait(timeout)
+
+
+def status() -> dict:
+    return {
+        "enabled": invalidation_enabled(),
+        "listening": _connected.is_set(),
+        **_counters,
+    }
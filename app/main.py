@@ -1,25 +1,49 @@
 from __future__ import annotations
 
+import math
 from collections import defaultdict
 from datetime import date, datetime, timedelta
 from statistics import mean, median
-from uuid import uuid4
+from typing import Literal, Optional
+from uuid import UUID, uuid4
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 
-from app import db
+from app import db, invalidation, progression_worker
+from app.compact import compact_plan
 from app.schemas import (
     SessionLogCreate,
     SessionPlanRequest,
     SessionPlanResponse,
+    WeeklyPlanBatchCreate,
+    WeeklyPlanBatchResponse,
     WeeklyPlanCreate,
     WeeklyPlanDay,
     WeeklyPlanResponse,
 )
+from app.singleflight import SingleFlight
 from app.templates import get_templates
 
 app = FastAPI(title="Workout MVP API")
 
+_plan_flights = SingleFlight()
+
+PROGRESSION_RULES = {
+    "miss_load_factor": 0.90,
+    "grind_rpe_margin": 1.0,
+    "progress_rpe_margin": 0.5,
+    "deload_stagnation_count": 6,
+    "deload_load_factor": 0.90,
+    "calibration_training_max_pct": 0.90,
+    "calibration_start_pct": 0.70,
+}
+
+LAST_N_SESSIONS = 6
+STATS_CAS_ATTEMPTS = 5
+WRITE_POSITION_COOKIE = "workout_wal"
+
 
 def _round_to_step(value: float | None, step: float | None) -> float | None:
     if value is None:
@@ -29,6 +53,14 @@ def _round_to_step(value: float | None, step: float | None) -> float | None:
     return round(round(value / step) * step, 2)
 
 
+def _floor_to_step(value: float | None, step: float | None) -> float | None:
+    if value is None:
+        return None
+    if not step or step <= 0:
+        return round(value, 2)
+    return round(math.floor(value / step + 1e-9) * step, 2)
+
+
 def _week_start(input_date: date) -> date:
     return input_date - timedelta(days=input_date.weekday())
 
@@ -43,6 +75,16 @@ def _generate_week_labels(strategy: str) -> list[str]:
     return ["UPPER", "CARDIO", "LOWER", "REST", "FULL", "CARDIO", "REST"]
 
 
+def _schedule_labels(
+    strategy: str, weeks: int, day_labels: list[str] | None, rotation: list[str] | None
+) -> list[list[str]]:
+    if rotation:
+        labels = [rotation[offset % len(rotation)] for offset in range(weeks * 7)]
+        return [labels[week * 7 : week * 7 + 7] for week in range(weeks)]
+    week_labels = list(day_labels) if day_labels else _generate_week_labels(strategy)
+    return [list(week_labels) for _ in range(weeks)]
+
+
 def _seed_stats_from_exercise(user_id: str, exercise: dict) -> dict:
     return {
         "user_id": user_id,
@@ -53,6 +95,9 @@ def _seed_stats_from_exercise(user_id: str, exercise: dict) -> dict:
         "rep_max": exercise["default_rep_max"],
         "target_rpe": exercise["default_target_rpe"],
         "stagnation_count": 0,
+        "version": 0,
+        "last_session_log_id": None,
+        "last_n_sessions": {"sessions": [], "summary": _summarize_sessions([])},
     }
 
 
@@ -60,19 +105,66 @@ def _estimate_e1rm_epley(load: float, reps: int) -> float:
     return load * (1 + reps / 30)
 
 
-def _starting_load_from_calibration(best_load: float, best_reps: int) -> float:
+def _session_entry(sets: list[dict]) -> dict:
+    loads = [s["load_used"] for s in sets if s.get("load_used") is not None]
+    rpes = [s["rpe"] for s in sets if s.get("rpe") is not None]
+    e1rms = [
+        _estimate_e1rm_epley(s["load_used"], s["reps_done"])
+        for s in sets
+        if s.get("load_used") is not None
+    ]
+    return {
+        "load": round(median(loads), 2) if loads else None,
+        "reps": median(s["reps_done"] for s in sets),
+        "rpe": round(mean(rpes), 2) if rpes else None,
+        "e1rm": round(max(e1rms), 2) if e1rms else None,
+    }
+
+
+def _summarize_sessions(sessions: list[dict]) -> dict:
+    loads = [s["load"] for s in sessions if s["load"] is not None]
+    rpes = [s["rpe"] for s in sessions if s["rpe"] is not None]
+    e1rms = [s["e1rm"] for s in sessions if s["e1rm"] is not None]
+    return {
+        "sessions": len(sessions),
+        "median_load": median(loads) if loads else None,
+        "median_reps": median(s["reps"] for s in sessions) if sessions else None,
+        "avg_rpe": round(mean(rpes), 2) if rpes else None,
+        "median_e1rm": median(e1rms) if e1rms else None,
+    }
+
+
+def _push_session(last_n_sessions: dict | None, sets: list[dict]) -> dict:
+    sessions = (last_n_sessions or {}).get("sessions", [])
+    if sets:
+        sessions = [*sessions, _session_entry(sets)][-LAST_N_SESSIONS:]
+    return {"sessions": sessions, "summary": _summarize_sessions(sessions)}
+
+
+def _starting_load_from_calibration(
+    best_load: float, best_reps: int, rules: dict | None = None
+) -> float:
+    rules = rules or PROGRESSION_RULES
     e1rm = _estimate_e1rm_epley(best_load, best_reps)
-    training_max = 0.90 * e1rm
-    return 0.70 * training_max
+    training_max = rules["calibration_training_max_pct"] * e1rm
+    return rules["calibration_start_pct"] * training_max
 
 
-def _maybe_deload(stagnation_count: int) -> str | None:
-    if stagnation_count >= 6:
+def _maybe_deload(stagnation_count: int, rules: dict | None = None) -> str | None:
+    rules = rules or PROGRESSION_RULES
+    if stagnation_count >= rules["deload_stagnation_count"]:
         return "DELOAD"
     return None
 
 
-def _progress_exercise(stats: dict, sets: list[dict], step_up_pct: float, rounding_step: float) -> dict:
+def _progress_exercise(
+    stats: dict,
+    sets: list[dict],
+    step_up_pct: float,
+    rounding_step: float,
+    rules: dict | None = None,
+) -> dict:
+    rules = rules or PROGRESSION_RULES
     loads = [s["load_used"] for s in sets if s.get("load_used") is not None]
     reps = [s["reps_done"] for s in sets]
     rpes = [s["rpe"] for s in sets if s.get("rpe") is not None]
@@ -88,7 +180,7 @@ def _progress_exercise(stats: dict, sets: list[dict], step_up_pct: float, roundi
     avg_rpe = mean(rpes) if rpes else None
 
     if not achieved_all_at_or_above_min:
-        new_load = load * 0.90
+        new_load = load * rules["miss_load_factor"]
         return {
             **stats,
             "next_load": _round_to_step(new_load, rounding_step),
@@ -96,9 +188,9 @@ def _progress_exercise(stats: dict, sets: list[dict], step_up_pct: float, roundi
             "phase": "TRAINING",
         }
 
-    if avg_rpe is not None and avg_rpe >= (stats["target_rpe"] + 1.0):
+    if avg_rpe is not None and avg_rpe >= (stats["target_rpe"] + rules["grind_rpe_margin"]):
         stagnation = stats["stagnation_count"] + 1
-        phase_override = _maybe_deload(stagnation)
+        phase_override = _maybe_deload(stagnation, rules)
         return {
             **stats,
             "next_load": _round_to_step(load, rounding_step),
@@ -106,7 +198,9 @@ def _progress_exercise(stats: dict, sets: list[dict], step_up_pct: float, roundi
             "phase": phase_override or "TRAINING",
         }
 
-    if achieved_all_at_max and (avg_rpe is None or avg_rpe <= stats["target_rpe"] + 0.5):
+    if achieved_all_at_max and (
+        avg_rpe is None or avg_rpe <= stats["target_rpe"] + rules["progress_rpe_margin"]
+    ):
         new_load = load * (1 + step_up_pct)
         return {
             **stats,
@@ -116,7 +210,7 @@ def _progress_exercise(stats: dict, sets: list[dict], step_up_pct: float, roundi
         }
 
     stagnation = stats["stagnation_count"] + 1
-    phase_override = _maybe_deload(stagnation)
+    phase_override = _maybe_deload(stagnation, rules)
     return {
         **stats,
         "next_load": _round_to_step(load, rounding_step),
@@ -166,13 +260,45 @@ def _session_phase(stats_map: dict) -> str:
     return "TRAINING"
 
 
-def _build_session_plan(user_id: str, input_date: date, session_type: str) -> dict:
-    templates = get_templates()
-    exercises = db.fetch_exercises()
-    stats_map = db.fetch_user_exercise_stats(user_id)
+def _build_prescription(slot: dict, exercise: dict, stats: dict) -> dict:
+    phase = stats["phase"]
+    load_suggestion = None
+    if phase != "CALIBRATION":
+        next_load = stats.get("next_load")
+        if next_load is not None:
+            load_suggestion = {
+                "kind": "KG",
+                "value": next_load,
+                "unit": "kg",
+                "rounding_step": exercise["rounding_step"],
+            }
+    return {"sets": _build_sets(slot, stats, phase, load_suggestion)}
 
-    template = templates[session_type.lower()]
+
+def _build_session_plan(
+    user_id: str, input_date: date, session_type: str, timezone: str = "UTC"
+) -> tuple[dict, dict[str, int]]:
+    exercises = db.get_exercise_library()
+    stats_map = db.fetch_user_exercise_stats(user_id)
+    plan, stats_versions, seeded = _assemble_session_plan(
+        user_id, input_date, session_type, exercises, stats_map, timezone
+    )
+    for stats in seeded:
+        db.insert_user_exercise_stats(user_id, stats)
+    return plan, stats_versions
+
+
+def _assemble_session_plan(
+    user_id: str,
+    input_date: date,
+    session_type: str,
+    exercises: dict,
+    stats_map: dict,
+    timezone: str = "UTC",
+) -> tuple[dict, dict[str, int], list[dict]]:
+    template = get_templates()[session_type.lower()]
     items = []
+    seeded = []
     for order, slot in enumerate(template["exercises"], start=1):
         if session_type == "CARDIO":
             exercise = {
@@ -193,22 +319,9 @@ def _build_session_plan(user_id: str, input_date: date, session_type: str) -> di
         if not stats:
             stats = _seed_stats_from_exercise(user_id, exercise)
             if session_type != "CARDIO":
-                db.upsert_user_exercise_stats(user_id, stats)
+                seeded.append(stats)
             stats_map[exercise["id"]] = stats
 
-        phase = stats["phase"]
-        load_suggestion = None
-        if phase != "CALIBRATION":
-            next_load = stats.get("next_load")
-            if next_load is not None:
-                load_suggestion = {
-                    "kind": "KG",
-                    "value": next_load,
-                    "unit": "kg",
-                    "rounding_step": exercise["rounding_step"],
-                }
-        sets = _build_sets(slot, stats, phase, load_suggestion)
-
         items.append(
             {
                 "order": order,
@@ -217,7 +330,7 @@ def _build_session_plan(user_id: str, input_date: date, session_type: str) -> di
                 "category": slot["category"],
                 "equipment": exercise.get("equipment"),
                 "substitutions": slot.get("substitutions", []),
-                "prescription": {"sets": sets},
+                "prescription": _build_prescription(slot, exercise, stats),
             }
         )
 
@@ -232,11 +345,11 @@ def _build_session_plan(user_id: str, input_date: date, session_type: str) -> di
                 for item in items
             }
         )
-    return {
+    plan = {
         "id": str(uuid4()),
         "user_id": user_id,
         "date": input_date.isoformat(),
-        "timezone": "UTC",
+        "timezone": timezone,
         "session_type": session_type,
         "phase": plan_phase,
         "readiness_hint": {"enabled": False, "adjustment": "NONE"},
@@ -244,24 +357,157 @@ def _build_session_plan(user_id: str, input_date: date, session_type: str) -> di
         "items": items,
         "created_at": datetime.utcnow().isoformat() + "Z",
     }
+    stats_versions = {
+        item["exercise_id"]: stats_map[item["exercise_id"]].get("version", 0)
+        for item in items
+        if session_type != "CARDIO"
+    }
+    return plan, stats_versions, seeded
 
 
-def _update_stats_from_log(user_id: str, exercise_id: str, sets: list[dict]) -> None:
-    exercises = db.fetch_exercises()
-    exercise = exercises.get(exercise_id)
-    if not exercise:
-        return
-
+def _refresh_session_plan(user_id: str, stored: dict) -> dict:
+    plan = stored["plan"]
+    template = get_templates()[plan["session_type"].lower()]
+    exercises = db.get_exercise_library()
     stats_map = db.fetch_user_exercise_stats(user_id)
-    stats = stats_map.get(exercise_id) or _seed_stats_from_exercise(user_id, exercise)
+
+    items = list(plan["items"])
+    prescriptions = {}
+    stats_versions = {}
+    for index, item in enumerate(items):
+        exercise_id = item["exercise_id"]
+        if exercise_id not in stored["stale_exercise_ids"]:
+            continue
+        exercise = exercises.get(exercise_id)
+        stats = stats_map.get(exercise_id)
+        if not exercise or not stats:
+            continue
+        slot = template["exercises"][item["order"] - 1]
+        prescription = _build_prescription(slot, exercise, stats)
+        items[index] = {**item, "prescription": prescription}
+        prescriptions[index] = prescription
+        stats_versions[exercise_id] = stats["version"]
+
+    if not prescriptions:
+        return {"plan": plan, "etag": stored["etag"]}
+    plan_phase = _session_phase(
+        {
+            item["exercise_id"]: stats_map.get(item["exercise_id"], {"phase": "CALIBRATION"})
+            for item in items
+        }
+    )
+    plan = {**plan, "phase": plan_phase, "items": items}
+    etag = db.content_etag(plan)
+    db.patch_session_plan_items(
+        user_id, plan["id"], plan_phase, prescriptions, stats_versions, etag
+    )
+    return {"plan": plan, "etag": etag}
+
+
+def _readiness_adjustment(readiness: dict | None) -> str:
+    if not readiness:
+        return "NONE"
+    try:
+        sleep = float(readiness["sleep"])
+        soreness = float(readiness["soreness"])
+        stress = float(readiness["stress"])
+    except (KeyError, TypeError, ValueError):
+        return "NONE"
+    score = 0.5 * sleep + 0.25 * (10 - soreness) + 0.25 * (10 - stress)
+    if score < 4.5:
+        return "LIGHTEN_LOAD_5"
+    if score < 5.5:
+        return "REDUCE_ONE_SET"
+    return "NONE"
+
+
+def _lighten_item(item: dict, pct: float) -> dict:
+    sets = []
+    for set_row in item["prescription"]["sets"]:
+        suggestion = set_row.get("load_suggestion")
+        if suggestion and suggestion.get("value") is not None:
+            step = suggestion.get("rounding_step")
+            lightened = _floor_to_step(suggestion["value"] * (1 - pct), step)
+            if step and lightened < step <= suggestion["value"]:
+                lightened = step
+            suggestion = {**suggestion, "value": lightened}
+            set_row = {**set_row, "load_suggestion": suggestion}
+        sets.append(set_row)
+    return {**item, "prescription": {**item["prescription"], "sets": sets}}
+
+
+def _reduce_item_sets(item: dict, count: int) -> dict:
+    sets = item["prescription"]["sets"]
+    keep = max(1, len(sets) - count)
+    return {**item, "prescription": {**item["prescription"], "sets": sets[:keep]}}
+
+
+def _easier_item(item: dict, exercises: dict) -> dict:
+    substitute = next((exercises[sub] for sub in item["substitutions"] if sub in exercises), None)
+    if not substitute:
+        return item
+    sets = [
+        {**set_row, "load_suggestion": None, "notes": "Easier variation – pick a load at ~RPE 7"}
+        for set_row in item["prescription"]["sets"]
+    ]
+    return {
+        **item,
+        "exercise_id": substitute["id"],
+        "name": substitute["name"],
+        "equipment": substitute.get("equipment"),
+        "substitutions": [item["exercise_id"]]
+        + [sub for sub in item["substitutions"] if sub != substitute["id"]],
+        "prescription": {**item["prescription"], "sets": sets},
+    }
+
+
+def _apply_readiness(plan: dict, adjustment: str, exercises: dict | None = None) -> dict:
+    if adjustment == "NONE":
+        return plan
+    items = []
+    for item in plan["items"]:
+        if item["category"] == "COMPOUND":
+            if adjustment == "LIGHTEN_LOAD_5":
+                item = _lighten_item(item, 0.05)
+            elif adjustment == "REDUCE_ONE_SET":
+                item = _reduce_item_sets(item, 1)
+            elif adjustment == "EASIER_VARIATION":
+                item = _easier_item(item, exercises or {})
+        items.append(item)
+    return {
+        **plan,
+        "readiness_hint": {"enabled": True, "adjustment": adjustment},
+        "items": items,
+    }
+
+
+def _next_stats(
+    stats: dict,
+    exercise: dict,
+    sets: list[dict],
+    rules: dict | None = None,
+    session_log_id: str | None = None,
+) -> dict:
+    if session_log_id is not None and stats.get("last_session_log_id") == session_log_id:
+        return stats
+    updated = _apply_session(stats, exercise, sets, rules)
+    updated["last_n_sessions"] = _push_session(stats.get("last_n_sessions"), sets)
+    updated["last_session_log_id"] = session_log_id
+    return updated
+
+
+def _apply_session(stats: dict, exercise: dict, sets: list[dict], rules: dict | None) -> dict:
+    rules = rules or PROGRESSION_RULES
+    stats = dict(stats)
 
     if stats["phase"] == "DELOAD":
         if stats["next_load"] is not None:
-            stats["next_load"] = _round_to_step(stats["next_load"] * 0.9, exercise["rounding_step"])
+            stats["next_load"] = _round_to_step(
+                stats["next_load"] * rules["deload_load_factor"], exercise["rounding_step"]
+            )
         stats["phase"] = "TRAINING"
         stats["stagnation_count"] = 0
-        db.upsert_user_exercise_stats(user_id, stats)
-        return
+        return stats
 
     if stats["phase"] == "CALIBRATION":
         best_set = None
@@ -271,87 +517,402 @@ def _update_stats_from_log(user_id: str, exercise_id: str, sets: list[dict]) ->
             if best_set is None or set_row["load_used"] > best_set["load_used"]:
                 best_set = set_row
         if best_set:
-            start = _starting_load_from_calibration(best_set["load_used"], best_set["reps_done"])
+            start = _starting_load_from_calibration(
+                best_set["load_used"], best_set["reps_done"], rules
+            )
             stats["next_load"] = _round_to_step(start, exercise["rounding_step"])
         stats["phase"] = "TRAINING"
         stats["stagnation_count"] = 0
-        db.upsert_user_exercise_stats(user_id, stats)
-        return
+        return stats
 
-    updated = _progress_exercise(stats, sets, exercise["step_up_pct"], exercise["rounding_step"])
+    updated = _progress_exercise(
+        stats, sets, exercise["step_up_pct"], exercise["rounding_step"], rules
+    )
     if updated["phase"] == "DELOAD" and updated["next_load"] is not None:
-        updated["next_load"] = _round_to_step(updated["next_load"] * 0.9, exercise["rounding_step"])
-    db.upsert_user_exercise_stats(user_id, updated)
+        updated["next_load"] = _round_to_step(
+            updated["next_load"] * rules["deload_load_factor"], exercise["rounding_step"]
+        )
+    return updated
+
+
+def _update_stats_from_log(
+    user_id: str, exercise_id: str, sets: list[dict], session_log_id: str | None = None
+) -> None:
+    exercises = db.get_exercise_library()
+    exercise = exercises.get(exercise_id)
+    if not exercise:
+        return
+
+    for _ in range(STATS_CAS_ATTEMPTS):
+        stats = db.fetch_user_exercise_stats(
+            user_id, readonly=False, exercise_id=exercise_id
+        ).get(exercise_id)
+        if stats is None:
+            seed = _seed_stats_from_exercise(user_id, exercise)
+            updated = _next_stats(seed, exercise, sets, session_log_id=session_log_id)
+            updated["version"] = 1
+            if db.insert_user_exercise_stats(user_id, updated):
+                return
+            continue
+        updated = _next_stats(stats, exercise, sets, session_log_id=session_log_id)
+        if updated is stats:
+            return
+        if db.compare_and_swap_user_exercise_stats(user_id, updated, stats["version"]):
+            return
+    raise db.StatsConflict(user_id, exercise_id, STATS_CAS_ATTEMPTS)
+
+
+def _apply_progression_job(job: dict) -> None:
+    _update_stats_from_log(
+        job["user_id"], job["exercise_id"], job["sets"], job["session_log_id"]
+    )
+
+
+def _get_or_create_session_plan(
+    user_id: str, input_date: date, session_type: str, timezone: str
+) -> dict:
+    stored = db.fetch_session_plan(user_id, input_date.isoformat(), session_type)
+    if stored:
+        if stored["stale_exercise_ids"]:
+            return _refresh_session_plan(user_id, stored)
+        return stored
+    plan, stats_versions = _build_session_plan(user_id, input_date, session_type, timezone)
+    return db.insert_session_plan(plan, stats_versions)
+
+
+def _local_today(timezone: str | None) -> date:
+    try:
+        zone = ZoneInfo(timezone or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = ZoneInfo("UTC")
+    return datetime.now(zone).date()
+
+
+def _plan_format(x_plan_format: str | None) -> str:
+    return "compact" if (x_plan_format or "").strip().lower() == "compact" else "full"
+
+
+def _wire_etag(etag: str | None, adjustment: str, plan_format: str = "full") -> str | None:
+    if not etag:
+        return None
+    if adjustment != "NONE":
+        etag = f"{etag}-{adjustment}"
+    if plan_format == "compact":
+        etag = f"{etag}-compact"
+    return f'"{etag}"'
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "X-Plan-Format"})
+
+
+def _etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _stored_etag_candidates(
+    if_none_match: str | None, adjustment: str, plan_format: str
+) -> list[str]:
+    if not if_none_match:
+        return []
+    suffix = _wire_etag("-", adjustment, plan_format)[2:]
+    candidates = []
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if len(tag) > len(suffix) and tag.startswith('"') and tag.endswith(suffix):
+            candidates.append(tag[1 : -len(suffix)])
+    return candidates
+
+
+def _serve_session_plan(
+    user_id: str,
+    input_date: date,
+    adjustment: str,
+    if_none_match: str | None,
+    response: Response,
+    plan_format: str = "full",
+) -> SessionPlanResponse | Response:
+    day_info = db.fetch_weekly_plan_day(user_id, input_date.isoformat())
+    if not day_info:
+        raise HTTPException(status_code=404, detail="No weekly plan for this date")
+    session_type = day_info["label"]
+    if session_type == "REST":
+        raise HTTPException(status_code=400, detail="Rest day has no session plan")
+    if progression_worker.write_behind_enabled():
+        progression_worker.flush_user(user_id, _apply_progression_job)
+
+    if if_none_match:
+        current = db.fetch_session_plan_etag(user_id, input_date.isoformat(), session_type)
+        if current and not current["stale"]:
+            etag = _wire_etag(current["etag"], adjustment, plan_format)
+            if _etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+
+    record = _plan_flights.do(
+        (user_id, input_date, session_type),
+        lambda: _get_or_create_session_plan(
+            user_id, input_date, session_type, day_info["timezone"]
+        ),
+    )
+    return _plan_response(record, adjustment, if_none_match, response, plan_format)
+
+
+def _plan_response(
+    record: dict,
+    adjustment: str,
+    if_none_match: str | None,
+    response: Response,
+    plan_format: str = "full",
+) -> SessionPlanResponse | Response:
+    etag = _wire_etag(record["etag"], adjustment, plan_format)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    plan = record["plan"]
+    if adjustment != "NONE":
+        exercises = db.get_exercise_library() if adjustment == "EASIER_VARIATION" else None
+        plan = _apply_readiness(plan, adjustment, exercises)
+    headers = {"Vary": "X-Plan-Format"}
+    if etag:
+        headers["ETag"] = etag
+    if plan_format == "compact":
+        body = compact_plan(SessionPlanResponse(**plan).model_dump(mode="json"))
+        return JSONResponse(body, headers={**headers, "X-Plan-Format": "compact"})
+    response.headers.update(headers)
+    return SessionPlanResponse(**plan)
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    with db.tracking_write_positions(request.cookies.get(WRITE_POSITION_COOKIE)) as positions:
+        received = dict(positions)
+        response = await call_next(request)
+    if positions != received:
+        response.set_cookie(
+            WRITE_POSITION_COOKIE,
+            db.format_write_positions(positions),
+            max_age=int(db.READ_YOUR_WRITES_SECONDS),
+            httponly=True,
+        )
+    return response
 
 
 @app.on_event("startup")
 def startup() -> None:
-    db.init_db()
-    db.seed_exercises()
+    if not db.fast_start_enabled():
+        db.init_db()
+        db.seed_exercises()
+    elif not db.schema_is_current():
+        db.init_db()
+    if invalidation.invalidation_enabled():
+        invalidation.start_listener()
+        db.warm_exercise_library(ready=lambda: invalidation.wait_until_listening(5))
+    else:
+        db.warm_exercise_library()
+    if progression_worker.write_behind_enabled():
+        progression_worker.start_workers(_apply_progression_job)
+    else:
+        progression_worker.start_workers(_apply_progression_job, count=1)
 
 
-@app.post("/weekly-plans", response_model=WeeklyPlanResponse)
+@app.on_event("shutdown")
+def shutdown() -> None:
+    progression_worker.stop_workers()
+    invalidation.stop_listener()
 
-def create_weekly_plan(payload: WeeklyPlanCreate) -> WeeklyPlanResponse:
-    plan_id = str(uuid4())
-    db.ensure_user(str(payload.user_id), payload.timezone)
-    labels = _generate_week_labels(payload.strategy)
-    days = []
-    for offset, label in enumerate(labels):
-        day_date = payload.week_start_date + timedelta(days=offset)
-        days.append(
+
+def _create_weekly_plans(
+    payload: WeeklyPlanCreate, weeks: int, on_conflict: str
+) -> WeeklyPlanBatchResponse:
+    user_id = str(payload.user_id)
+    db.ensure_user(user_id, payload.timezone)
+    strategy = "CUSTOM" if payload.day_labels or payload.rotation else payload.strategy
+    schedule = _schedule_labels(strategy, weeks, payload.day_labels, payload.rotation)
+
+    plans = []
+    days = {}
+    for week, labels in enumerate(schedule):
+        week_start = payload.week_start_date + timedelta(weeks=week)
+        plans.append(
+            {
+                "id": str(uuid4()),
+                "week_start_date": week_start.isoformat(),
+                "timezone": payload.timezone,
+                "strategy": strategy,
+            }
+        )
+        days[week_start.isoformat()] = [
             {
-                "date": day_date.isoformat(),
+                "date": (week_start + timedelta(days=offset)).isoformat(),
                 "label": label,
                 "session_plan_id": None,
                 "notes": None,
             }
-        )
+            for offset, label in enumerate(labels)
+        ]
+
+    try:
+        stored = db.insert_weekly_plans(user_id, plans, days, on_conflict)
+    except db.WeeklyPlanConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    created_at = datetime.utcnow()
+    return WeeklyPlanBatchResponse(
+        weeks=[
+            WeeklyPlanResponse(
+                id=stored[plan["week_start_date"]],
+                user_id=payload.user_id,
+                week_start_date=plan["week_start_date"],
+                timezone=plan["timezone"],
+                strategy=plan["strategy"],
+                days=[WeeklyPlanDay(**day) for day in days[plan["week_start_date"]]],
+                created_at=created_at,
+            )
+            for plan in plans
+            if plan["week_start_date"] in stored
+        ],
+        skipped_week_start_dates=[
+            plan["week_start_date"] for plan in plans if plan["week_start_date"] not in stored
+        ],
+    )
 
-    plan = {
-        "id": plan_id,
-        "user_id": str(payload.user_id),
-        "week_start_date": payload.week_start_date.isoformat(),
-        "timezone": payload.timezone,
-        "strategy": payload.strategy,
+
+@app.get("/health")
+
+def health() -> dict:
+    return {
+        "status": "ok",
+        "replicas": db.replica_status(),
+        "cache_invalidation": invalidation.status(),
     }
 
-    db.insert_weekly_plan(plan, days)
 
-    return WeeklyPlanResponse(
-        id=plan_id,
-        user_id=payload.user_id,
-        week_start_date=payload.week_start_date,
-        timezone=payload.timezone,
-        strategy=payload.strategy,
-        days=[WeeklyPlanDay(**day) for day in days],
-        created_at=datetime.utcnow(),
-    )
+@app.get("/progression/metrics")
+
+def progression_metrics() -> dict:
+    return progression_worker.metrics()
+
+
+@app.post("/weekly-plans", response_model=WeeklyPlanResponse)
+
+def create_weekly_plan(payload: WeeklyPlanCreate) -> WeeklyPlanResponse:
+    return _create_weekly_plans(payload, weeks=1, on_conflict="ERROR").weeks[0]
+
+
+@app.post("/weekly-plans/batch", response_model=WeeklyPlanBatchResponse)
+
+def create_weekly_plans(payload: WeeklyPlanBatchCreate) -> WeeklyPlanBatchResponse:
+    return _create_weekly_plans(payload, weeks=payload.weeks, on_conflict=payload.on_conflict)
+
+
+@app.get("/weekly-plans", response_model=WeeklyPlanResponse)
+
+def read_weekly_plan(
+    user_id: UUID,
+    week_start_date: date,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+) -> WeeklyPlanResponse | Response:
+    if if_none_match:
+        etag = _wire_etag(db.fetch_weekly_plan_etag(str(user_id), week_start_date.isoformat()), "NONE")
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+    plan = db.fetch_weekly_plan(str(user_id), week_start_date.isoformat())
+    if not plan:
+        raise HTTPException(status_code=404, detail="No weekly plan for this week")
+    etag = _wire_etag(plan.pop("etag"), "NONE")
+    if etag:
+        response.headers["ETag"] = etag
+    return WeeklyPlanResponse(**plan)
 
 
 @app.post("/session-plans", response_model=SessionPlanResponse)
 
-def generate_session_plan(payload: SessionPlanRequest) -> SessionPlanResponse:
-    day_info = db.fetch_weekly_plan_day(str(payload.user_id), payload.date.isoformat())
-    if not day_info:
-        raise HTTPException(status_code=404, detail="No weekly plan for this date")
-    session_type = day_info["label"]
-    if session_type == "REST":
+def generate_session_plan(
+    payload: SessionPlanRequest,
+    response: Response,
+    x_plan_format: Optional[str] = Header(default=None),
+) -> SessionPlanResponse | Response:
+    adjustment = payload.readiness_adjustment or _readiness_adjustment(payload.readiness)
+    return _serve_session_plan(
+        str(payload.user_id),
+        payload.date,
+        adjustment,
+        None,
+        response,
+        _plan_format(x_plan_format),
+    )
+
+
+@app.get("/session-plans", response_model=SessionPlanResponse)
+
+def read_session_plan(
+    user_id: UUID,
+    response: Response,
+    plan_date: date = Query(alias="date"),
+    readiness_adjustment: Literal[
+        "NONE", "LIGHTEN_LOAD_5", "REDUCE_ONE_SET", "EASIER_VARIATION"
+    ] = "NONE",
+    if_none_match: Optional[str] = Header(default=None),
+    x_plan_format: Optional[str] = Header(default=None),
+) -> SessionPlanResponse | Response:
+    return _serve_session_plan(
+        str(user_id),
+        plan_date,
+        readiness_adjustment,
+        if_none_match,
+        response,
+        _plan_format(x_plan_format),
+    )
+
+
+@app.get("/session-plans/today", response_model=SessionPlanResponse)
+
+def read_today_session_plan(
+    user_id: UUID,
+    response: Response,
+    readiness_adjustment: Literal[
+        "NONE", "LIGHTEN_LOAD_5", "REDUCE_ONE_SET", "EASIER_VARIATION"
+    ] = "NONE",
+    if_none_match: Optional[str] = Header(default=None),
+    x_plan_format: Optional[str] = Header(default=None),
+) -> SessionPlanResponse | Response:
+    user_id = str(user_id)
+    plan_format = _plan_format(x_plan_format)
+    today = _local_today(db.get_user_timezone(user_id))
+    if progression_worker.write_behind_enabled():
+        progression_worker.flush_user(user_id, _apply_progression_job)
+    day = db.fetch_session_plan_for_day(
+        user_id,
+        today.isoformat(),
+        _stored_etag_candidates(if_none_match, readiness_adjustment, plan_format),
+    )
+    if not day:
+        raise HTTPException(status_code=404, detail="No weekly plan for today")
+    if day["label"] == "REST":
         raise HTTPException(status_code=400, detail="Rest day has no session plan")
-    plan = db.fetch_session_plan(str(payload.user_id), payload.date.isoformat(), session_type)
-    if plan:
-        return SessionPlanResponse(**plan)
 
-    plan = _build_session_plan(str(payload.user_id), payload.date, session_type)
-    db.insert_session_plan(plan)
-    return SessionPlanResponse(**plan)
+    stored = day["stored"]
+    if stored and not stored["stale_exercise_ids"]:
+        if stored["plan"] is None:
+            return _not_modified(_wire_etag(stored["etag"], readiness_adjustment, plan_format))
+        record = stored
+    else:
+        record = _plan_flights.do(
+            (user_id, today, day["label"]),
+            lambda: _get_or_create_session_plan(user_id, today, day["label"], day["timezone"]),
+        )
+    return _plan_response(record, readiness_adjustment, if_none_match, response, plan_format)
 
 
 @app.post("/session-logs")
 
 def log_session(payload: SessionLogCreate) -> dict:
     log_id = str(uuid4())
-    db.ensure_user(str(payload.user_id), "UTC")
+    db.ensure_user(str(payload.user_id))
     set_rows = []
     for entry in payload.sets:
         set_rows.append(
@@ -365,6 +926,11 @@ def log_session(payload: SessionLogCreate) -> dict:
             }
         )
 
+    grouped_sets = defaultdict(list)
+    for row in set_rows:
+        grouped_sets[row["exercise_id"]].append(row)
+
+    write_behind = progression_worker.write_behind_enabled()
     db.insert_session_log(
         {
             "id": log_id,
@@ -376,13 +942,22 @@ def log_session(payload: SessionLogCreate) -> dict:
             "notes": payload.notes,
         },
         set_rows,
+        progression=grouped_sets if write_behind else None,
     )
 
-    grouped_sets = defaultdict(list)
-    for row in set_rows:
-        grouped_sets[row["exercise_id"]].append(row)
-
-    for exercise_id, exercise_sets in grouped_sets.items():
-        _update_stats_from_log(str(payload.user_id), exercise_id, exercise_sets)
+    if not write_behind:
+        exercise_ids = list(grouped_sets)
+        for index, exercise_id in enumerate(exercise_ids):
+            try:
+                _update_stats_from_log(
+                    str(payload.user_id), exercise_id, grouped_sets[exercise_id], log_id
+                )
+            except db.StatsConflict:
+                db.enqueue_progression(
+                    str(payload.user_id),
+                    log_id,
+                    {eid: grouped_sets[eid] for eid in exercise_ids[index:]},
+                )
+                return {"status": "ok", "session_log_id": log_id, "progression": "deferred"}
 
     return {"status": "ok", "session_log_id": log_id}
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from statistics import median
+
+from app import db
+
+_STARTUP_PROBE = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+app.main.startup()
+ready = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "startup_ms": (ready - imported) * 1000}))
+"""
+
+
+def init_db() -> None:
+    db.init_db()
+    print(f"schema {db.schema_version()} applied")
+
+
+def seed() -> None:
+    print(f"{db.seed_exercises()} exercises seeded")
+
+
+def rebalance(dry_run: bool) -> None:
+    for move in db.rebalance(dry_run=dry_run):
+        print(json.dumps(move))
+
+
+def move_user(user_id: str, target_name: str) -> None:
+    target = next((shard for shard in db.shards() if shard["name"] == target_name), None)
+    if target is None:
+        raise SystemExit(f"unknown shard {target_name}")
+    for source in db.shards():
+        if source["name"] != target_name:
+            try:
+                rows = db.move_user(user_id, source, target)
+            except db.UserMoveConflict as exc:
+                raise SystemExit(str(exc)) from exc
+            if rows:
+                print(f"moved {rows} rows from {source['name']} to {target_name}")
+                return
+    print(f"user {user_id} not found outside {target_name}")
+
+
+def failed_jobs(user_id: str | None) -> None:
+    for job in db.failed_progression_jobs(user_id):
+        print(json.dumps(job))
+
+
+def requeue_failed(user_id: str | None) -> None:
+    print(f"{db.requeue_progression_jobs(user_id)} progression jobs requeued")
+
+
+def startup_time(runs: int, fast_start: bool) -> None:
+    env = dict(os.environ)
+    if fast_start:
+        env["WORKOUT_FAST_START"] = "1"
+    samples = []
+    for _ in range(runs):
+        spawned = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", _STARTUP_PROBE],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample["process_ms"] = (time.perf_counter() - spawned) * 1000
+        samples.append(sample)
+    print(
+        json.dumps(
+            {
+                "runs": runs,
+                "fast_start": fast_start,
+                **{
+                    key: round(median(sample[key] for sample in samples), 1)
+                    for key in ("import_ms", "startup_ms", "process_ms")
+                },
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Workout API maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("init-db", help="Apply spec/db/schema.sql and record its version.")
+    commands.add_parser("seed", help="Upsert spec/exercises_seed.json into exercises.")
+    balance = commands.add_parser(
+        "rebalance", help="Move users whose hash-ring shard differs from where they live."
+    )
+    balance.add_argument("--dry-run", action="store_true")
+    move = commands.add_parser("move-user", help="Move one user's rows to the named shard.")
+    move.add_argument("user_id")
+    move.add_argument("shard")
+    failed = commands.add_parser(
+        "failed-jobs", help="List progression outbox jobs that exhausted their retries."
+    )
+    failed.add_argument("--user", dest="user_id")
+    requeue = commands.add_parser(
+        "requeue-failed", help="Reset FAILED progression jobs to PENDING with fresh attempts."
+    )
+    requeue.add_argument("--user", dest="user_id")
+    timing = commands.add_parser("startup-time", help="Measure import + startup() in fresh processes.")
+    timing.add_argument("--runs", type=int, default=5)
+    timing.add_argument("--full", action="store_true", help="Measure without WORKOUT_FAST_START.")
+    args = parser.parse_args()
+
+    if args.command == "init-db":
+        init_db()
+    elif args.command == "seed":
+        seed()
+    elif args.command == "rebalance":
+        rebalance(args.dry_run)
+    elif args.command == "move-user":
+        move_user(args.user_id, args.shard)
+    elif args.command == "failed-jobs":
+        failed_jobs(args.user_id)
+    elif args.command == "requeue-failed":
+        requeue_failed(args.user_id)
+    else:
+        startup_time(args.runs, fast_start=not args.full)
+
+
+if __name__ == "__main__":
+    main()
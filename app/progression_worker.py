@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Callable
+
+import psycopg2
+
+from app import db
+
+PROGRESSION_WORKERS = int(os.environ.get("WORKOUT_PROGRESSION_WORKERS", "2"))
+POLL_SECONDS = float(os.environ.get("WORKOUT_PROGRESSION_POLL_SECONDS", "0.5"))
+FLUSH_TIMEOUT_SECONDS = float(os.environ.get("WORKOUT_PROGRESSION_FLUSH_TIMEOUT_SECONDS", "5"))
+
+_stop = threading.Event()
+_threads: list[threading.Thread] = []
+_counters = {"DONE": 0, "RETRY": 0, "FAILED": 0}
+_counters_lock = threading.Lock()
+
+
+def write_behind_enabled() -> bool:
+    return os.environ.get("WORKOUT_PROGRESSION_MODE", "sync").lower() == "async"
+
+
+def _record(status: str) -> None:
+    with _counters_lock:
+        _counters[status] += 1
+
+
+def _drain(handler: Callable[[dict], None]) -> None:
+    while not _stop.is_set():
+        busy = False
+        for shard in db.shards():
+            try:
+                status = db.process_progression_job(shard, handler)
+            except psycopg2.Error:
+                status = None
+            if status:
+                _record(status)
+                busy = True
+        if not busy:
+            _stop.wait(POLL_SECONDS)
+
+
+def start_workers(handler: Callable[[dict], None], count: int = PROGRESSION_WORKERS) -> None:
+    _stop.clear()
+    for index in range(count):
+        thread = threading.Thread(
+            target=_drain, args=(handler,), name=f"progression-worker-{index}", daemon=True
+        )
+        thread.start()
+        _threads.append(thread)
+
+
+def stop_workers(timeout: float = 5.0) -> None:
+    _stop.set()
+    for thread in _threads:
+        thread.join(timeout)
+    _threads.clear()
+
+
+def flush_user(
+    user_id: str, handler: Callable[[dict], None], timeout: float = FLUSH_TIMEOUT_SECONDS
+) -> bool:
+    shard = db.shard_for_user(user_id)
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            status = db.process_progression_job(
+                shard, handler, user_id=user_id, wait=True, lock_timeout=remaining
+            )
+        except psycopg2.errors.LockNotAvailable:
+            return False
+        if status:
+            _record(status)
+            if status != "DONE":
+                return False
+            continue
+        if not db.has_pending_progression(user_id):
+            return True
+        time.sleep(0.01)
+
+
+def metrics() -> dict:
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        "mode": "async" if write_behind_enabled() else "sync",
+        "workers": sum(thread.is_alive() for thread in _threads),
+        "processed": counters["DONE"],
+        "retried": counters["RETRY"],
+        "failed": counters["FAILED"],
+        "backlog": db.progression_backlog(),
+    }
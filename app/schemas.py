@@ -4,7 +4,7 @@ from datetime import date, datetime
 from typing import Literal, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class WeeklyPlanCreate(BaseModel):
@@ -12,6 +12,25 @@ class WeeklyPlanCreate(BaseModel):
     week_start_date: date
     timezone: str = "UTC"
     strategy: Literal["ULF_2C", "FULL_3", "UL_4", "CUSTOM"] = "ULF_2C"
+    day_labels: Optional[
+        list[Literal["UPPER", "LOWER", "FULL", "CARDIO", "MOBILITY", "REST"]]
+    ] = Field(default=None, min_length=7, max_length=7)
+    rotation: Optional[
+        list[Literal["UPPER", "LOWER", "FULL", "CARDIO", "MOBILITY", "REST"]]
+    ] = Field(default=None, min_length=1)
+
+    @model_validator(mode="after")
+    def _one_custom_schedule(self) -> WeeklyPlanCreate:
+        if self.day_labels is not None and self.rotation is not None:
+            raise ValueError("Set either day_labels or rotation, not both")
+        if self.strategy == "CUSTOM" and self.day_labels is None and self.rotation is None:
+            raise ValueError("strategy CUSTOM requires day_labels or rotation")
+        return self
+
+
+class WeeklyPlanBatchCreate(WeeklyPlanCreate):
+    weeks: int = Field(default=1, ge=1, le=52)
+    on_conflict: Literal["SKIP", "REPLACE", "ERROR"] = "SKIP"
 
 
 class WeeklyPlanDay(BaseModel):
@@ -31,6 +50,11 @@ class WeeklyPlanResponse(BaseModel):
     created_at: datetime
 
 
+class WeeklyPlanBatchResponse(BaseModel):
+    weeks: list[WeeklyPlanResponse]
+    skipped_week_start_dates: list[date] = Field(default_factory=list)
+
+
 class LoadSuggestion(BaseModel):
     kind: Literal["KG", "LB", "BODYWEIGHT", "MACHINE_LEVEL"]
     value: float
@@ -92,6 +116,10 @@ class SessionPlanResponse(BaseModel):
 class SessionPlanRequest(BaseModel):
     user_id: UUID
     date: date
+    readiness: Optional[dict] = None
+    readiness_adjustment: Optional[
+        Literal["NONE", "LIGHTEN_LOAD_5", "REDUCE_ONE_SET", "EASIER_VARIATION"]
+    ] = None
 
 
 class SessionLogSet(BaseModel):
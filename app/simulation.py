@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from statistics import median
+
+from app import db
+from app.main import (
+    PROGRESSION_RULES,
+    _assemble_session_plan,
+    _generate_week_labels,
+    _next_stats,
+    _round_to_step,
+)
+
+START_DATE = date(2026, 1, 5)
+
+BASE_STRENGTH = {"BARBELL": 70.0, "MACHINE": 70.0, "CABLE": 45.0, "DUMBBELL": 22.0}
+PATTERN_STRENGTH = {
+    "SQUAT": 1.6,
+    "HINGE": 1.5,
+    "UNILATERAL": 0.8,
+    "ARM": 0.5,
+    "ISOLATION": 0.7,
+    "CARRY": 1.3,
+}
+BODYWEIGHT_MAX_REPS = 15.0
+
+
+def _exercise_library(step_up_pct: float | None) -> dict[str, dict]:
+    library = {}
+    for exercise in db.load_exercise_seed():
+        exercise = {
+            **exercise,
+            "default_target_rpe": float(exercise["default_target_rpe"]),
+            "step_up_pct": float(exercise["step_up_pct"]),
+            "rounding_step": float(exercise["rounding_step"]),
+        }
+        if step_up_pct is not None and exercise["equipment"] != "BODYWEIGHT":
+            exercise["step_up_pct"] = step_up_pct
+        library[exercise["id"]] = exercise
+    return library
+
+
+def _synthetic_athlete(rng: random.Random, exercises: dict[str, dict]) -> dict:
+    scale = rng.lognormvariate(0.0, 0.35)
+    strength = {}
+    for exercise in exercises.values():
+        if exercise["equipment"] == "BODYWEIGHT":
+            base = BODYWEIGHT_MAX_REPS
+        else:
+            base = BASE_STRENGTH.get(exercise["equipment"], 40.0)
+            base *= PATTERN_STRENGTH.get(exercise["pattern"], 1.0)
+        strength[exercise["id"]] = base * scale * rng.uniform(0.85, 1.15)
+    return {
+        "strength": strength,
+        "initial_strength": dict(strength),
+        "adaptation_rate": rng.uniform(0.002, 0.012),
+        "rpe_noise": rng.uniform(0.25, 1.0),
+        "adherence": rng.uniform(0.7, 1.0),
+        "sessions": Counter(),
+    }
+
+
+def _perform_item(rng: random.Random, athlete: dict, exercise: dict, item: dict) -> list[dict]:
+    strength = athlete["strength"][exercise["id"]]
+    sets = item["prescription"]["sets"]
+    suggestion = sets[0]["load_suggestion"] if sets else None
+
+    if exercise["equipment"] == "BODYWEIGHT":
+        load = None
+        capacity = strength
+    else:
+        if suggestion and suggestion["value"]:
+            load = suggestion["value"]
+        else:
+            calibration_reps = sets[0]["target_reps_max"] + rng.uniform(3.0, 4.0) if sets else 10
+            load = _round_to_step(strength / (1 + calibration_reps / 30), exercise["rounding_step"])
+        load = max(load, exercise["rounding_step"] or 1.0)
+        capacity = 30 * (strength / load - 1)
+
+    rows = []
+    for idx, set_row in enumerate(sets):
+        available = capacity - idx
+        rir_goal = max(0.0, 10 - set_row["target_rpe"])
+        reps = min(set_row["target_reps_max"], max(0.0, available - rir_goal))
+        if reps < set_row["target_reps_min"]:
+            reps = max(0.0, min(set_row["target_reps_min"], available))
+        reps = int(reps)
+        rpe = 10 - (available - reps) + rng.gauss(0.0, athlete["rpe_noise"])
+        rows.append(
+            {
+                "exercise_id": exercise["id"],
+                "set_number": set_row["set_number"],
+                "reps_done": reps,
+                "load_used": load,
+                "rpe": round(min(10.0, max(5.0, rpe)) * 2) / 2,
+            }
+        )
+
+    sessions = athlete["sessions"][exercise["id"]]
+    intensity = load / strength if load else 0.75
+    stimulus = min(1.5, max(0.0, intensity - 0.5) / 0.3)
+    athlete["strength"][exercise["id"]] = strength * (
+        1 + athlete["adaptation_rate"] * stimulus * math.exp(-sessions / 40)
+    )
+    athlete["sessions"][exercise["id"]] = sessions + 1
+    return rows
+
+
+def _simulate_athlete(index: int, config: dict) -> dict:
+    rng = random.Random(f"{config['seed']}:{index}")
+    exercises = _exercise_library(config["step_up_pct"])
+    athlete = _synthetic_athlete(rng, exercises)
+    user_id = f"sim-{index}"
+    labels = _generate_week_labels(config["strategy"])
+
+    stats_map: dict[str, dict] = {}
+    weekly_loads = []
+    deloads = 0
+    peak_stagnation: dict[str, int] = defaultdict(int)
+    for week in range(config["weeks"]):
+        for offset, label in enumerate(labels):
+            if label not in ("UPPER", "LOWER", "FULL"):
+                continue
+            if rng.random() > athlete["adherence"]:
+                continue
+            day = START_DATE + timedelta(weeks=week, days=offset)
+            plan, _, _ = _assemble_session_plan(user_id, day, label, exercises, stats_map)
+            for item in plan["items"]:
+                exercise = exercises[item["exercise_id"]]
+                rows = _perform_item(rng, athlete, exercise, item)
+                stats = _next_stats(stats_map[exercise["id"]], exercise, rows, config["rules"])
+                if stats["phase"] == "DELOAD":
+                    deloads += 1
+                peak_stagnation[exercise["id"]] = max(
+                    peak_stagnation[exercise["id"]], stats["stagnation_count"]
+                )
+                stats_map[exercise["id"]] = stats
+        weekly_loads.append({eid: stats["next_load"] for eid, stats in stats_map.items()})
+
+    strength_gain = [
+        athlete["strength"][eid] / athlete["initial_strength"][eid] - 1 for eid in stats_map
+    ]
+    return {
+        "weekly_loads": weekly_loads,
+        "deloads": deloads,
+        "peak_stagnation": dict(peak_stagnation),
+        "final_stagnation": {eid: stats["stagnation_count"] for eid, stats in stats_map.items()},
+        "strength_gain": median(strength_gain) if strength_gain else 0.0,
+    }
+
+
+def _simulate_chunk(args: tuple[int, int, dict]) -> list[dict]:
+    start, stop, config = args
+    return [_simulate_athlete(index, config) for index in range(start, stop)]
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        f"p{pct}": round(ordered[round(last * pct / 100)], 2) for pct in (10, 50, 90)
+    }
+
+
+def _summarize(results: list[dict], config: dict) -> dict:
+    loads: dict[str, list[list[float]]] = defaultdict(lambda: [[] for _ in range(config["weeks"])])
+    for result in results:
+        for week, week_loads in enumerate(result["weekly_loads"]):
+            for exercise_id, load in week_loads.items():
+                if load is not None:
+                    loads[exercise_id][week].append(load)
+
+    athlete_weeks = len(results) * config["weeks"]
+    deloads = [result["deloads"] for result in results]
+    peak = Counter(
+        count for result in results for count in result["peak_stagnation"].values()
+    )
+    final = Counter(
+        count for result in results for count in result["final_stagnation"].values()
+    )
+    return {
+        "config": config,
+        "athletes": len(results),
+        "load_trajectories": {
+            exercise_id: [_percentiles(week) if week else None for week in weeks]
+            for exercise_id, weeks in sorted(loads.items())
+        },
+        "deloads": {
+            "total": sum(deloads),
+            "per_athlete_week": round(sum(deloads) / athlete_weeks, 4) if athlete_weeks else 0.0,
+            "athletes_with_deload": round(sum(1 for d in deloads if d) / len(results), 4)
+            if results
+            else 0.0,
+        },
+        "stagnation": {
+            "peak_histogram": dict(sorted(peak.items())),
+            "final_histogram": dict(sorted(final.items())),
+        },
+        "strength_gain": _percentiles([result["strength_gain"] for result in results])
+        if results
+        else None,
+    }
+
+
+def run_simulation(
+    athletes: int = 1000,
+    weeks: int = 12,
+    strategy: str = "ULF_2C",
+    seed: int = 0,
+    workers: int | None = None,
+    step_up_pct: float | None = None,
+    rules: dict | None = None,
+) -> dict:
+    config = {
+        "athletes": athletes,
+        "weeks": weeks,
+        "strategy": strategy,
+        "seed": seed,
+        "step_up_pct": step_up_pct,
+        "rules": {**PROGRESSION_RULES, **(rules or {})},
+    }
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, math.ceil(athletes / (workers * 4)))
+    chunks = [
+        (start, min(start + chunk_size, athletes), config)
+        for start in range(0, athletes, chunk_size)
+    ]
+    if workers == 1:
+        batches = map(_simulate_chunk, chunks)
+        results = [result for batch in batches for result in batch]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [result for batch in pool.map(_simulate_chunk, chunks) for result in batch]
+    return _summarize(results, config)
+
+
+def _parse_rule(value: str) -> tuple[str, float]:
+    key, _, raw = value.partition("=")
+    if key not in PROGRESSION_RULES or not raw:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=VALUE with NAME in {', '.join(PROGRESSION_RULES)}"
+        )
+    return key, float(raw)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate progression rules on synthetic athletes.")
+    parser.add_argument("--athletes", type=int, default=1000)
+    parser.add_argument("--weeks", type=int, default=12)
+    parser.add_argument("--strategy", default="ULF_2C", choices=["ULF_2C", "FULL_3", "UL_4"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--step-up-pct", type=float, default=None)
+    parser.add_argument("--rule", type=_parse_rule, action="append", default=[])
+    args = parser.parse_args()
+
+    report = run_simulation(
+        athletes=args.athletes,
+        weeks=args.weeks,
+        strategy=args.strategy,
+        seed=args.seed,
+        workers=args.workers,
+        step_up_pct=args.step_up_pct,
+        rules=dict(args.rule),
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+-- SCHEMA VERSION (hash of this file, written by init_db; checked on fast start)
+CREATE TABLE schema_version (
+  version TEXT PRIMARY KEY,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
 -- USERS
 CREATE TABLE users (
   id UUID PRIMARY KEY,
@@ -36,6 +42,9 @@ CREATE TABLE user_exercise_stats (
   rep_max INT NOT NULL,
   target_rpe NUMERIC(3,1) NOT NULL,
   stagnation_count INT NOT NULL DEFAULT 0,
+  version INT NOT NULL DEFAULT 0,              -- bumped on every write; plans record what they saw
+  last_n_sessions JSONB NOT NULL DEFAULT '{}', -- rolling window of recent session summaries
+  last_session_log_id UUID,                    -- last log applied; replayed outbox jobs are skipped
   last_updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   PRIMARY KEY (user_id, exercise_id)
 );
@@ -47,6 +56,7 @@ CREATE TABLE weekly_plans (
   week_start_date DATE NOT NULL,
   timezone TEXT NOT NULL,
   strategy TEXT NOT NULL,
+  etag TEXT,                                   -- content hash of the plan and its days
   created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   UNIQUE (user_id, week_start_date)
 );
@@ -69,6 +79,8 @@ CREATE TABLE session_plans (
   session_type TEXT NOT NULL,
   phase TEXT NOT NULL,
   plan_json JSONB NOT NULL,                    -- store full SessionPlan
+  stats_versions JSONB NOT NULL DEFAULT '{}',  -- exercise_id -> user_exercise_stats.version used
+  etag TEXT,                                   -- content hash of plan_json, set on every write
   created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   UNIQUE (user_id, date, session_type)
 );
@@ -98,3 +110,28 @@ CREATE TABLE session_log_sets (
 
 CREATE INDEX idx_log_sets_exercise ON session_log_sets (exercise_id);
 CREATE INDEX idx_user_log_date ON session_logs (user_id, date DESC);
+
+-- PROGRESSION OUTBOX (stats updates pending when progression runs write-behind; rows are deleted once applied,
+-- FAILED rows stay and block later jobs for the same user and exercise until requeued)
+CREATE TABLE progression_outbox (
+  id UUID PRIMARY KEY,
+  user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+  session_log_id UUID REFERENCES session_logs(id) ON DELETE CASCADE,
+  exercise_id TEXT NOT NULL,
+  sets_json JSONB NOT NULL,
+  status TEXT NOT NULL DEFAULT 'PENDING',      -- PENDING/FAILED
+  attempts INT NOT NULL DEFAULT 0,
+  last_error TEXT,
+  available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX idx_outbox_pending ON progression_outbox (user_id, exercise_id, created_at, id);
+
+-- COLUMNS ADDED AFTER FIRST RELEASE (CREATE TABLE IF NOT EXISTS leaves existing tables untouched)
+ALTER TABLE user_exercise_stats ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 0;
+ALTER TABLE user_exercise_stats ADD COLUMN IF NOT EXISTS last_n_sessions JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE weekly_plans ADD COLUMN IF NOT EXISTS etag TEXT;
+ALTER TABLE session_plans ADD COLUMN IF NOT EXISTS stats_versions JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE session_plans ADD COLUMN IF NOT EXISTS etag TEXT;
+ALTER TABLE user_exercise_stats ADD COLUMN IF NOT EXISTS last_session_log_id UUID;
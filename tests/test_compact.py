@@ -0,0 +1,86 @@
+from app.compact import compact_plan, compact_prescription, expand_plan, expand_prescription
+
+
+def _set(set_number: int, **fields) -> dict:
+    row = {
+        "set_number": set_number,
+        "target_reps_min": 8,
+        "target_reps_max": 10,
+        "target_rpe": 7.5,
+        "rest_seconds": 120,
+        "load_suggestion": 60.0,
+        "tempo": None,
+        "notes": None,
+    }
+    row.update(fields)
+    return row
+
+
+def test_identical_sets_collapse_into_one_group():
+    prescription = {"sets": [_set(1), _set(2), _set(3)]}
+
+    compact = compact_prescription(prescription)
+
+    assert len(compact["set_groups"]) == 1
+    assert compact["set_groups"][0]["count"] == 3
+    assert expand_prescription(compact) == prescription
+
+
+def test_differing_sets_round_trip():
+    prescription = {
+        "sets": [
+            _set(1, load_suggestion=50.0, target_rpe=6.0),
+            _set(2),
+            _set(3),
+            _set(4, notes="AMRAP", target_reps_max=None),
+        ]
+    }
+
+    compact = compact_prescription(prescription)
+
+    assert [group["count"] for group in compact["set_groups"]] == [1, 2, 1]
+    assert expand_prescription(compact) == prescription
+
+
+def test_gaps_in_set_numbers_round_trip():
+    prescription = {"sets": [_set(1), _set(2), _set(4), _set(5), _set(9, tempo="3-1-1")]}
+
+    compact = compact_prescription(prescription)
+
+    assert [group.get("first_set_number") for group in compact["set_groups"]] == [None, 4, 9]
+    assert expand_prescription(compact) == prescription
+
+
+def test_sets_not_starting_at_one_round_trip():
+    prescription = {"sets": [_set(3), _set(4)]}
+
+    compact = compact_prescription(prescription)
+
+    assert compact["set_groups"][0]["first_set_number"] == 3
+    assert expand_prescription(compact) == prescription
+
+
+def test_empty_prescription_round_trips():
+    assert expand_prescription(compact_prescription({"sets": []})) == {"sets": []}
+
+
+def test_expand_leaves_full_prescription_untouched():
+    prescription = {"sets": [_set(1)]}
+
+    assert expand_prescription(prescription) is prescription
+
+
+def test_plan_round_trip_keeps_item_fields():
+    plan = {
+        "date": "2026-01-12",
+        "items": [
+            {"exercise_id": "back_squat", "prescription": {"sets": [_set(1), _set(2)]}},
+            {"exercise_id": "plank", "prescription": {"sets": [_set(1, load_suggestion=None)]}},
+        ],
+    }
+
+    compact = compact_plan(plan)
+
+    assert all("set_groups" in item["prescription"] for item in compact["items"])
+    assert expand_plan(compact) == plan
+    assert expand_plan(plan) is plan
@@ -0,0 +1,89 @@
+from app.main import LAST_N_SESSIONS, _next_stats, _seed_stats_from_exercise
+
+EXERCISE = {
+    "id": "back_squat",
+    "default_rep_min": 5,
+    "default_rep_max": 8,
+    "default_target_rpe": 7.5,
+    "step_up_pct": 0.025,
+    "rounding_step": 2.5,
+}
+
+
+def _training_stats(**fields) -> dict:
+    stats = _seed_stats_from_exercise("user-1", EXERCISE)
+    stats.update({"phase": "TRAINING", "next_load": 100.0, "version": 3})
+    stats.update(fields)
+    return stats
+
+
+def _sets(reps: int, load: float = 100.0, rpe: float = 7.5, count: int = 3) -> list[dict]:
+    return [{"reps_done": reps, "load_used": load, "rpe": rpe} for _ in range(count)]
+
+
+def test_progress_at_rep_max_raises_load():
+    updated = _next_stats(_training_stats(), EXERCISE, _sets(8), session_log_id="log-1")
+
+    assert updated["next_load"] == 102.5
+    assert updated["stagnation_count"] == 0
+    assert updated["last_session_log_id"] == "log-1"
+
+
+def test_replayed_session_log_is_ignored():
+    first = _next_stats(_training_stats(), EXERCISE, _sets(8), session_log_id="log-1")
+
+    replayed = _next_stats(first, EXERCISE, _sets(8), session_log_id="log-1")
+
+    assert replayed is first
+    assert replayed["next_load"] == 102.5
+    assert len(replayed["last_n_sessions"]["sessions"]) == 1
+
+
+def test_new_session_log_is_applied_after_previous_one():
+    first = _next_stats(_training_stats(), EXERCISE, _sets(8), session_log_id="log-1")
+
+    second = _next_stats(first, EXERCISE, _sets(8, load=102.5), session_log_id="log-2")
+
+    assert second["next_load"] == 105.0
+    assert second["last_session_log_id"] == "log-2"
+    assert len(second["last_n_sessions"]["sessions"]) == 2
+
+
+def test_missed_reps_reset_stagnation_and_lower_load():
+    stats = _training_stats(stagnation_count=2)
+
+    updated = _next_stats(stats, EXERCISE, _sets(4))
+
+    assert updated["next_load"] == 90.0
+    assert updated["stagnation_count"] == 0
+
+
+def test_calibration_sets_starting_load():
+    stats = _seed_stats_from_exercise("user-1", EXERCISE)
+
+    updated = _next_stats(stats, EXERCISE, _sets(5, load=100.0, count=2), session_log_id="log-1")
+
+    assert updated["phase"] == "TRAINING"
+    assert updated["next_load"] == 72.5
+    assert updated["last_n_sessions"]["summary"]["median_load"] == 100.0
+
+
+def test_session_window_keeps_last_n_sessions():
+    stats = _training_stats()
+    for index in range(LAST_N_SESSIONS + 2):
+        sets = _sets(6, load=100.0 + index)
+        stats = _next_stats(stats, EXERCISE, sets, session_log_id=f"log-{index}")
+
+    sessions = stats["last_n_sessions"]["sessions"]
+    assert len(sessions) == LAST_N_SESSIONS
+    assert sessions[0]["load"] == 102.0
+    assert stats["last_n_sessions"]["summary"]["sessions"] == LAST_N_SESSIONS
+
+
+def test_input_stats_are_not_mutated():
+    stats = _training_stats()
+    snapshot = {**stats, "last_n_sessions": {**stats["last_n_sessions"]}}
+
+    _next_stats(stats, EXERCISE, _sets(8), session_log_id="log-1")
+
+    assert stats == snapshot